@@ -0,0 +1,14 @@
+# Typ-Deklarationen für den optionalen Cython-Build von cell_row_convert.py
+# (augmentierende .pxd: die .py-Datei bleibt reiner Python-Code)
+cimport cython
+
+cpdef object _safe_float(object value, object default=*)
+cpdef object _safe_int(object value, object default=*)
+cpdef object _safe_float_int(object value, object default=*)
+cpdef object _generate_uuid(dict cell_data, str today_str)
+cpdef str _convert_available(object value)
+cpdef object _parse_datetime(object value)
+cpdef object normalize_project_name(object name)
+
+@cython.locals(i=Py_ssize_t, row=tuple)
+cpdef tuple convert_row(dict cell_data, dict project_ids, str today_str)
@@ -0,0 +1,193 @@
+"""
+Zeilen-Konvertierung für den Cell-Import aus JSON (import_cells_from_json.py)
+
+Ohne Django-Abhängigkeiten, damit das Modul in Worker-Prozessen läuft und
+optional mit Cython kompiliert werden kann (das Docker-Image macht das beim Build):
+
+    pip install cython
+    cythonize -i -3 cell_row_convert.py
+
+Die Typen für den Build (dict/str-Parameter, C-Index in der NOT-NULL-Schleife,
+cpdef-Helfer) stehen in cell_row_convert.pxd, die .py-Datei bleibt reiner
+Python-Code. Die kompilierte Extension (.so/.pyd) wird beim Import automatisch
+der .py-Datei vorgezogen, ohne Cython läuft der reine Python-Code.
+"""
+
+import ipaddress
+from datetime import datetime, timezone
+
+DEFAULT_PROJECT_NAME = 'Importierte Zellen'
+
+# Zielspalten für COPY, Reihenfolge entspricht den Tupeln aus convert_row()
+COPY_COLUMNS = (
+    'UUID', 'project_id', 'available',
+    # Messwerte (siehe MEASUREMENT_FIELDS)
+    'capacity', 'voltage', 'esr', 'esr_ac', 'min_voltage', 'max_voltage',
+    'store_voltage', 'temp_before_test', 'cycles_count', 'test_duration',
+    'insertion_date', 'device_ip', 'device_slot', 'device_type',
+    # Konstante Werte (siehe CONSTANT_VALUES)
+    'cell_type', 'device_mac', 'charge_duration', 'discharge_duration',
+    'avg_temp_charging', 'avg_temp_discharging', 'max_temp_charging',
+    'max_temp_discharging', 'testing_current', 'discharge_mode', 'status',
+    'bat_position', 'battery_id', 'removal_date',
+)
+
+# Spalten, die NULL sein dürfen (alle anderen sind NOT NULL)
+NULLABLE_COLUMNS = ('battery_id', 'removal_date')
+REQUIRED_INDEXES = tuple(
+    i for i, name in enumerate(COPY_COLUMNS) if name not in NULLABLE_COLUMNS
+)
+
+
+# Werte, die als "leer" gelten und den Default liefern
+_SENTINELS = frozenset((None, '', "b''"))
+
+
+def _safe_float(value, default=0.0):
+    """Konvertiert sicher zu Float"""
+    if type(value) is float:
+        return value
+    try:
+        return float(value) if value not in _SENTINELS else default
+    except (ValueError, TypeError):
+        return default
+
+
+def _safe_int(value, default=0):
+    """Konvertiert sicher zu Int"""
+    if type(value) is int:
+        return value
+    try:
+        return int(value) if value not in _SENTINELS else default
+    except (ValueError, TypeError):
+        return default
+
+
+def _safe_float_int(value, default=0):
+    """Konvertiert sicher über Float zu Int (z.B. Temperatur 25.7 -> 25)"""
+    return int(_safe_float(value, default))
+
+
+# Messwerte: (JSON-Key, Konverter, Default falls Key fehlt), Reihenfolge wie COPY_COLUMNS
+MEASUREMENT_FIELDS = (
+    ('capacity', _safe_float, 0),
+    ('voltage', _safe_float, 0),
+    ('esr', _safe_float, 0),
+    ('esr_ac', _safe_float, 0),
+    ('min_voltage', _safe_float, 2.8),
+    ('max_voltage', _safe_float, 4.25),
+    ('store_voltage', _safe_float, 3.4),
+    ('temperature', _safe_float_int, 0),
+    ('discharge_cycles', _safe_int, 0),
+    ('action_length', _safe_float, 0),
+)
+
+# Feste Werte am Ende jeder Zeile, Reihenfolge wie COPY_COLUMNS
+CONSTANT_VALUES = (
+    '18650',  # cell_type: aktuell nur dieser Type
+    '00:00:00:00:00:00',  # device_mac
+    0.0,  # charge_duration
+    0.0,  # discharge_duration
+    0,  # avg_temp_charging
+    0,  # avg_temp_discharging
+    0,  # max_temp_charging
+    0,  # max_temp_discharging
+    0,  # testing_current
+    'CC',  # discharge_mode
+    'Completed',  # status
+    '',  # bat_position
+    None,  # battery_id
+    None,  # removal_date
+)
+
+
+def _generate_uuid(cell_data, today_str):
+    """Generiert UUID im Format D{YYYYMMDD}-S{SerialNumber:06d}"""
+    cell_serial = cell_data.get('CellSerialNumber')
+    log_date = cell_data.get('LogDate')
+    
+    if cell_serial and log_date:
+        # Schneller Pfad: "YYYY-MM-DD ..." direkt zerschneiden statt strptime
+        if isinstance(log_date, str):
+            if len(log_date) >= 10 and log_date[4] == '-' and log_date[7] == '-':
+                return f"D{log_date[:4]}{log_date[5:7]}{log_date[8:10]}-S{int(cell_serial):06d}"
+        else:
+            try:
+                date_str = log_date.strftime('%Y%m%d')
+                return f"D{date_str}-S{int(cell_serial):06d}"
+            except Exception as e:
+                print(f"  ⚠ Fehler beim UUID-Generieren: {e}")
+    
+    # Fallback
+    if cell_serial:
+        return f"D{today_str}-S{int(cell_serial):06d}"
+    
+    return None
+
+
+# Available-Werte aus dem Export -> Yes/No
+_AVAILABLE = {1: 'Yes', '1': 'Yes', 0: 'No', '0': 'No', "b''": 'Yes', '': 'Yes'}
+
+
+def _convert_available(value):
+    """Konvertiert Available-Wert zu Yes/No String"""
+    return _AVAILABLE.get(value, 'Yes')  # Default (auch leer) = Available
+
+
+def _parse_datetime(value):
+    """Parsed Datetime-String und macht es timezone-aware"""
+    if not value or value == '':
+        return None
+    
+    try:
+        if isinstance(value, str):
+            # Format: "2022-09-09 16:49:13.5815584" (Sekundenbruchteile abschneiden)
+            dt = datetime.fromisoformat(value.split('.', 1)[0])
+            # Make timezone-aware (UTC)
+            return dt.replace(tzinfo=timezone.utc)
+        return value
+    except Exception:
+        return None
+
+
+def normalize_project_name(name):
+    """Normalisiert ProjectName (leer -> Default-Project)"""
+    if not name or name.strip() == '':
+        return DEFAULT_PROJECT_NAME
+    return name
+
+
+def convert_row(cell_data, project_ids, today_str):
+    """Konvertiert eine Zelle aus dem Export zu einer COPY-Zeile
+    
+    Reine Funktion ohne DB-Zugriff, damit sie in Worker-Prozessen laufen kann.
+    Gibt None zurück, wenn keine UUID generierbar ist.
+    """
+    uuid = _generate_uuid(cell_data, today_str)
+    if not uuid:
+        return None
+    
+    # Ungültige IPs hier abweisen, sonst scheitert der ganze COPY-Block
+    device_ip = cell_data.get('charger_icc', '192.168.1.33')
+    ipaddress.ip_address(device_ip)
+    
+    # Tupel direkt bauen statt Cells-Instanz (spart Model-__init__ pro Zeile)
+    get = cell_data.get
+    row = (
+        uuid,
+        project_ids[normalize_project_name(get('ProjectName'))],
+        _convert_available(get('Available', 1)),
+        *[conv(get(key, default)) for key, conv, default in MEASUREMENT_FIELDS],
+        _parse_datetime(get('LogDate')),
+        device_ip,
+        _safe_int(get('CCiD', 0)),
+        get('charger_type', 'McC'),
+        *CONSTANT_VALUES,
+    )
+    
+    # NOT-NULL-Verletzungen pro Zelle melden statt pro COPY-Block
+    for i in REQUIRED_INDEXES:
+        if row[i] is None:
+            raise ValueError(f"{COPY_COLUMNS[i]} darf nicht leer sein ({uuid})")
+    
+    return row
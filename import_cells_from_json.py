@@ -6,10 +6,14 @@ Importiert Zellen aus CellLibrary JSON-Export in PostgreSQL
 
 import os
 import sys
+import csv
+import io
 import json
+import ipaddress
+import multiprocessing
+from collections import deque
 import django
 from datetime import datetime, timedelta
-import pytz
 
 # Django Setup
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -17,12 +21,119 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard.settings')
 django.setup()
 
 from megacellcnc.models import Projects, Cells
-from django.db import connection as django_connection
+from django.db import connection as django_connection, transaction
+
+# Zeilen-Konvertierung (im Docker-Image mit Cython kompiliert, siehe cell_row_convert.py)
+from cell_row_convert import COPY_COLUMNS, DEFAULT_PROJECT_NAME, normalize_project_name, convert_row
+
+# Optional: ijson zum Streamen großer Exporte (pip install ijson),
+# wählt automatisch das schnellste Backend (yajl2_c falls verfügbar)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: orjson für schnelleres JSON-Parsing (pip install orjson)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: pgcopy für binäres COPY (pip install pgcopy), sonst Text-COPY
+try:
+    from pgcopy import CopyManager
+except ImportError:
+    CopyManager = None
+
+# Defaults für automatisch angelegte Projects
+PROJECT_DEFAULTS = {
+    'CellType': '18650',
+    'Notes': 'Automatisch importiert aus JSON',
+    'LastCellNumber': 0,
+    'Status': 'Active',
+    'TotalCells': 0,
+    'DevCnt': 0
+}
+
+# Anzahl Zellen pro COPY-Aufruf
+COPY_CHUNK_SIZE = 50000
+
+# Seitengröße wenn ein COPY-Block fehlschlägt (erst seitenweise, dann einzeln)
+FALLBACK_PAGE_SIZE = 100
+
+# Anzahl Zellen pro Konvertierungs-Block (Einheit für die Worker-Prozesse)
+CONVERT_CHUNK_SIZE = 5000
+
+# Django-Felder zu den COPY-Spalten (Spaltennamen, NULL-Constraints)
+COPY_FIELDS = [Cells._meta.get_field(name) for name in COPY_COLUMNS]
+COPY_SQL = "COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(
+    table=Cells._meta.db_table,
+    columns=', '.join(django_connection.ops.quote_name(f.column) for f in COPY_FIELDS),
+)
+UUID_INDEX = 0
+# Maximale Länge der varchar-Spalten (pgcopy würde zu lange Werte still abschneiden)
+MAX_LENGTHS = tuple(
+    (i, f.max_length) for i, f in enumerate(COPY_FIELDS)
+    if f.get_internal_type() == 'CharField' and f.max_length
+)
+
+
+def _inet_formatter(value):
+    """Binär-Format für inet (device_ip), von pgcopy nicht unterstützt"""
+    addr = ipaddress.ip_address(value)
+    packed = addr.packed
+    family = 2 if addr.version == 4 else 3  # PGSQL_AF_INET / PGSQL_AF_INET6
+    return (f"i4B{len(packed)}s",
+            (4 + len(packed), family, addr.max_prefixlen, 0, len(packed), packed))
+
+
+if CopyManager is not None:
+    class CellCopyManager(CopyManager):
+        type_formatters = {'inet': _inet_formatter}
+
+
+def _csv_row(row):
+    """Ersetzt None durch den COPY-NULL-Marker \\N"""
+    return ['\\N' if value is None else value for value in row]
+
+
+# Zustand der Worker-Prozesse (gesetzt durch _init_worker)
+_worker_state = {}
+
+
+def _init_worker(today_str):
+    """Initialisiert einen Worker mit dem Fallback-Datum"""
+    _worker_state['today_str'] = today_str
+
+
+def _convert_chunk(cells_chunk, project_ids):
+    """Konvertiert einen Block Zellen, gibt (rows, skipped, errors) zurück"""
+    today_str = _worker_state['today_str']
+    rows = []
+    skipped = 0
+    errors = 0
+    
+    for cell_data in cells_chunk:
+        try:
+            row = convert_row(cell_data, project_ids, today_str)
+        except Exception as e:
+            print(f"  ⚠ Fehler beim Importieren: {e}")
+            errors += 1
+            continue
+        
+        if row is None:
+            print(f"  ⚠ Überspringe Zelle: Keine UUID generierbar")
+            skipped += 1
+        else:
+            rows.append(row)
+    
+    return rows, skipped, errors
 
 
 class CellImporter:
-    def __init__(self, json_file):
+    def __init__(self, json_file, workers=None):
         self.json_file = json_file
+        self.workers = workers or os.cpu_count() or 1  # Prozesse für die Konvertierung
         self.stats = {
             'total': 0,
             'imported': 0,
@@ -30,167 +141,127 @@ class CellImporter:
             'errors': 0
         }
         self.projects = {}  # Cache für Projects: {name: project_obj}
+        self._pending = []  # Gepufferte COPY-Zeilen
+        self._copy_manager = None
+        self._csv_buf = None  # Wiederverwendeter Puffer für Text-COPY
+        self._csv_writer = None
+        self._existing = None  # Bereits vorhandene/gepufferte UUIDs
+        self._truncated = False
+        self._triggers_disabled = False
+        self._today_str = datetime.now().strftime('%Y%m%d')  # Fallback-Datum für UUIDs
+        self._loaded_cells = None  # Ohne ijson: einmal geladene Zellen (Pre-Pass + Import)
         
-    def _get_or_create_project(self, project_name):
-        """Holt oder erstellt ein Project"""
-        if not project_name or project_name.strip() == '':
-            project_name = 'Importierte Zellen'
-        
-        # Aus Cache holen wenn vorhanden
-        if project_name in self.projects:
-            return self.projects[project_name]
-        
-        # Project erstellen oder holen
-        project, created = Projects.objects.get_or_create(
-            Name=project_name,
-            defaults={
-                'CellType': '18650',
-                'Notes': 'Automatisch importiert aus JSON',
-                'LastCellNumber': 0,
-                'Status': 'Active',
-                'TotalCells': 0,
-                'DevCnt': 0
-            }
-        )
+    def _iter_project_names(self):
+        """Liefert die ProjectName-Werte aller Zellen
         
-        # In Cache speichern
-        self.projects[project_name] = project
-        
-        if created:
-            print(f"  ✓ Project '{project_name}' erstellt (ID: {project.id})")
-        
-        return project
+        Nicht-String-Namen werden ausgelassen, diese Zellen scheitern später
+        einzeln in convert_row statt den ganzen Import abzubrechen.
+        """
+        if ijson is not None:
+            # Nur Parser-Events auswerten, keine kompletten Zell-Dicts bauen
+            with open(self.json_file, 'rb') as f:
+                found = False
+                for prefix, event, value in ijson.parse(f):
+                    if prefix == 'item.ProjectName':
+                        found = True
+                        if event in ('string', 'null'):
+                            yield value
+                    elif prefix == 'item':
+                        if event == 'start_map':
+                            found = False
+                        elif event == 'end_map' and not found:
+                            yield DEFAULT_PROJECT_NAME
+        else:
+            for cell_data in self._iter_cells():
+                name = cell_data.get('ProjectName', DEFAULT_PROJECT_NAME)
+                if name is None or isinstance(name, str):
+                    yield name
     
-    def _generate_uuid(self, cell_data):
-        """Generiert UUID im Format D{YYYYMMDD}-S{SerialNumber:06d}"""
-        cell_serial = cell_data.get('CellSerialNumber')
-        log_date = cell_data.get('LogDate')
-        
-        if cell_serial and log_date:
-            try:
-                # Parse LogDate
-                if isinstance(log_date, str):
-                    date_obj = datetime.strptime(log_date.split('.')[0], '%Y-%m-%d %H:%M:%S')
-                else:
-                    date_obj = log_date
-                
-                date_str = date_obj.strftime('%Y%m%d')
-                return f"D{date_str}-S{int(cell_serial):06d}"
-            except Exception as e:
-                print(f"  ⚠ Fehler beim UUID-Generieren: {e}")
+    def _preload_projects(self):
+        """Lädt/erstellt alle Projects des Exports vorab mit zwei Queries"""
+        names = {normalize_project_name(name) for name in self._iter_project_names()}
         
-        # Fallback
-        if cell_serial:
-            date_str = datetime.now().strftime('%Y%m%d')
-            return f"D{date_str}-S{int(cell_serial):06d}"
+        for project in Projects.objects.filter(Name__in=names).order_by('id'):
+            self.projects.setdefault(project.Name, project)
         
-        return None
-    
-    def _convert_available(self, value):
-        """Konvertiert Available-Wert zu Yes/No String"""
-        if value == 1 or value == '1':
-            return 'Yes'
-        elif value == 0 or value == '0':
-            return 'No'
-        elif value == "b''" or value == '':
-            return 'Yes'  # Empty = Available
-        else:
-            return 'Yes'  # Default
+        missing = names - self.projects.keys()
+        if missing:
+            created = Projects.objects.bulk_create(
+                [Projects(Name=name, **PROJECT_DEFAULTS) for name in sorted(missing)]
+            )
+            for project in created:
+                self.projects[project.Name] = project
+                print(f"  ✓ Project '{project.Name}' erstellt (ID: {project.id})")
     
-    def _parse_datetime(self, value):
-        """Parsed Datetime-String und macht es timezone-aware"""
-        if not value or value == '':
-            return None
+    def _flush(self):
+        """Schreibt gepufferte Zellen per COPY FROM STDIN in die DB"""
+        if not self._pending:
+            return
         
         try:
-            if isinstance(value, str):
-                # Format: "2022-09-09 16:49:13.5815584"
-                dt = datetime.strptime(value.split('.')[0], '%Y-%m-%d %H:%M:%S')
-                # Make timezone-aware (UTC)
-                return pytz.UTC.localize(dt)
-            return value
-        except Exception:
-            return None
+            # Savepoint, damit ein Fehler die Import-Transaktion nicht abbricht
+            with transaction.atomic():
+                self._copy_rows(self._pending)
+            self.stats['imported'] += len(self._pending)
+        except Exception as e:
+            print(f"  ⚠ Fehler beim Schreiben von {len(self._pending)} Zellen, seitenweise: {e}")
+            self._flush_paged(self._pending)
+        
+        self._pending = []
     
-    def _safe_float(self, value, default=0.0):
-        """Konvertiert sicher zu Float"""
-        try:
-            return float(value) if value not in [None, '', 'b\'\''] else default
-        except (ValueError, TypeError):
-            return default
+    def _flush_paged(self, rows):
+        """Fallback: kleine Seiten per COPY, nur fehlerhafte Seiten Zelle für Zelle"""
+        for start in range(0, len(rows), FALLBACK_PAGE_SIZE):
+            page = rows[start:start + FALLBACK_PAGE_SIZE]
+            try:
+                with transaction.atomic():
+                    self._copy_rows(page)
+                self.stats['imported'] += len(page)
+                continue
+            except Exception:
+                pass
+            
+            for row in page:
+                try:
+                    with transaction.atomic():
+                        self._copy_rows([row])
+                    self.stats['imported'] += 1
+                except Exception as e:
+                    print(f"  ⚠ Fehler beim Importieren von {row[UUID_INDEX]}: {e}")
+                    self.stats['errors'] += 1
     
-    def _safe_int(self, value, default=0):
-        """Konvertiert sicher zu Int"""
-        try:
-            return int(value) if value not in [None, '', 'b\'\''] else default
-        except (ValueError, TypeError):
-            return default
+    def _copy_rows(self, rows):
+        """COPY binär (pgcopy) oder als CSV"""
+        if CopyManager is not None:
+            self._copy_binary(rows)
+        else:
+            self._copy_text(rows)
     
-    def _import_cell(self, cell_data):
-        """Importiert eine einzelne Zelle"""
-        try:
-            # Project holen/erstellen
-            project_name = cell_data.get('ProjectName', 'Importierte Zellen')
-            project = self._get_or_create_project(project_name)
-            
-            # UUID generieren
-            uuid = self._generate_uuid(cell_data)
-            if not uuid:
-                print(f"  ⚠ Überspringe Zelle: Keine UUID generierbar")
-                self.stats['skipped'] += 1
-                return False
-            
-            # Prüfen ob Zelle bereits existiert
-            if Cells.objects.filter(UUID=uuid).exists():
-                self.stats['skipped'] += 1
-                return False
-            
-            # Available Status konvertieren
-            available = self._convert_available(cell_data.get('Available', 1))
-            
-            # Cell erstellen
-            cell = Cells(
-                UUID=uuid,
-                project=project,
-                available=available,
-                capacity=self._safe_float(cell_data.get('capacity', 0)),
-                voltage=self._safe_float(cell_data.get('voltage', 0)),
-                esr=self._safe_float(cell_data.get('esr', 0)),
-                esr_ac=self._safe_float(cell_data.get('esr_ac', 0)),
-                min_voltage=self._safe_float(cell_data.get('min_voltage', 2.8)),
-                max_voltage=self._safe_float(cell_data.get('max_voltage', 4.25)),
-                store_voltage=self._safe_float(cell_data.get('store_voltage', 3.4)),
-                temp_before_test=self._safe_float(cell_data.get('temperature', 0)),
-                cycles_count=self._safe_int(cell_data.get('discharge_cycles', 0)),
-                test_duration=self._safe_float(cell_data.get('action_length', 0)),
-                insertion_date=self._parse_datetime(cell_data.get('LogDate')),
-                cell_type='18650',  # Aktuell nur dieser Type
-                device_ip=cell_data.get('charger_icc', '192.168.1.33'),
-                device_slot=self._safe_int(cell_data.get('CCiD', 0)),
-                device_mac='00:00:00:00:00:00',
-                device_type=cell_data.get('charger_type', 'McC'),
-                charge_duration=0.0,
-                discharge_duration=0.0,
-                avg_temp_charging=0,
-                avg_temp_discharging=0,
-                max_temp_charging=0,
-                max_temp_discharging=0,
-                testing_current=0,
-                discharge_mode='CC',
-                status='Completed',
-                bat_position='',
-                battery=None,
-                removal_date=None
+    def _copy_binary(self, rows):
+        """COPY im Binärformat via pgcopy"""
+        if self._copy_manager is None:
+            django_connection.ensure_connection()
+            self._copy_manager = CellCopyManager(
+                django_connection.connection,
+                Cells._meta.db_table,
+                [f.column for f in COPY_FIELDS]
             )
-            
-            cell.save()
-            self.stats['imported'] += 1
-            return True
-            
-        except Exception as e:
-            print(f"  ⚠ Fehler beim Importieren: {e}")
-            self.stats['errors'] += 1
-            return False
+        self._copy_manager.copy(rows, io.BytesIO)
+    
+    def _copy_text(self, rows):
+        """COPY im CSV-Format, NULL als \\N (Puffer wird zwischen Blöcken wiederverwendet)"""
+        if self._csv_buf is None:
+            self._csv_buf = io.StringIO()
+            self._csv_writer = csv.writer(self._csv_buf, lineterminator='\n')
+        buf = self._csv_buf
+        buf.seek(0)
+        buf.truncate(0)
+        
+        self._csv_writer.writerows(map(_csv_row, rows))
+        buf.seek(0)
+        
+        with django_connection.cursor() as cursor:
+            cursor.copy_expert(COPY_SQL, buf)
     
     def truncate_tables(self):
         """Leert Ziel-Tabellen"""
@@ -203,33 +274,184 @@ class CellImporter:
             print("  ✓ megacellcnc_projects geleert")
             
             django_connection.commit()
+        
+        self._truncated = True
+    
+    def _disable_indexes_and_triggers(self):
+        """Entfernt Sekundär-Indizes und deaktiviert Trigger vor dem Bulk-Load
+        
+        Läuft innerhalb der Import-Transaktion: bei einem Rollback sind
+        Indizes und Trigger automatisch wiederhergestellt.
+        """
+        table = Cells._meta.db_table
+        with django_connection.cursor() as cursor:
+            # Alle Indizes außer Primary Key / Unique (z.B. project_id, battery_id)
+            cursor.execute("""
+                SELECT i.relname, pg_get_indexdef(i.oid)
+                FROM pg_index x
+                JOIN pg_class i ON i.oid = x.indexrelid
+                WHERE x.indrelid = %s::regclass
+                AND NOT x.indisprimary
+                AND NOT x.indisunique
+            """, [table])
+            indexes = cursor.fetchall()
+            
+            for index_name, _ in indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {django_connection.ops.quote_name(index_name)}")
+            print(f"  ✓ {len(indexes)} Indizes von {table} entfernt")
+        
+        # Trigger (inkl. FK-Checks) abschalten, benötigt Superuser-Rechte
+        try:
+            with transaction.atomic():
+                with django_connection.cursor() as cursor:
+                    cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER ALL")
+            self._triggers_disabled = True
+        except Exception as e:
+            print(f"  ⚠ Trigger konnten nicht deaktiviert werden: {e}")
+        
+        return [index_def for _, index_def in indexes]
+    
+    def _restore_indexes_and_triggers(self, index_defs):
+        """Legt entfernte Indizes neu an und aktiviert Trigger wieder"""
+        table = Cells._meta.db_table
+        with django_connection.cursor() as cursor:
+            if self._triggers_disabled:
+                cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER ALL")
+                self._triggers_disabled = False
+            
+            for index_def in index_defs:
+                cursor.execute(index_def)
+        if index_defs:
+            print(f"  ✓ {len(index_defs)} Indizes von {table} neu erstellt")
+    
+    def _iter_cells(self):
+        """Liefert die Zellen aus der JSON-Datei einzeln (mit ijson gestreamt)"""
+        if ijson is not None:
+            with open(self.json_file, 'rb') as f:
+                yield from ijson.items(f, 'item', use_float=True)
+        else:
+            # Ohne ijson wird die Datei ohnehin komplett geladen: nur einmal parsen
+            # und für Pre-Pass und Import wiederverwenden
+            if self._loaded_cells is None:
+                if orjson is not None:
+                    with open(self.json_file, 'rb') as f:
+                        self._loaded_cells = orjson.loads(f.read())
+                else:
+                    with open(self.json_file, 'r', encoding='utf-8') as f:
+                        self._loaded_cells = json.load(f)
+            yield from self._loaded_cells
+    
+    def _iter_chunks(self):
+        """Fasst die Zellen zu Blöcken für die Worker zusammen"""
+        chunk = []
+        for cell_data in self._iter_cells():
+            chunk.append(cell_data)
+            if len(chunk) >= CONVERT_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def _start_pool(self):
+        """Startet die Worker-Prozesse, None wenn ohne Worker konvertiert wird
+        
+        Muss vor dem Öffnen der DB-Verbindung laufen: die Worker werden geforkt
+        und dürfen den libpq-Socket des Elternprozesses nicht erben.
+        """
+        if self.workers <= 1:
+            return None
+        django_connection.close()
+        return multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(self._today_str,))
+    
+    def _iter_converted(self, pool):
+        """Konvertiert die Blöcke parallel, liefert Ergebnisse in Datei-Reihenfolge"""
+        # Project-IDs stehen erst nach _preload_projects fest, daher pro Block übergeben
+        project_ids = {name: project.id for name, project in self.projects.items()}
+        
+        if pool is None:
+            _init_worker(self._today_str)
+            for chunk in self._iter_chunks():
+                yield _convert_chunk(chunk, project_ids)
+            return
+        
+        # Nur wenige Blöcke gleichzeitig in Arbeit halten (Pool.imap würde die
+        # komplette Datei vorab einlesen und das Streamen aushebeln)
+        in_flight = deque()
+        for chunk in self._iter_chunks():
+            in_flight.append(pool.apply_async(_convert_chunk, (chunk, project_ids)))
+            if len(in_flight) >= self.workers * 2:
+                yield in_flight.popleft().get()
+        while in_flight:
+            yield in_flight.popleft().get()
     
     def import_cells(self):
         """Hauptfunktion für Import"""
         print(f"\n=== Importiere Zellen aus JSON ===\n")
         print(f"Datei: {self.json_file}\n")
         
-        # JSON laden
+        pool = self._start_pool()
+        
+        # Gesamter Import in einer Transaktion: ein Commit statt einem pro Batch,
+        # synchronous_commit=OFF ist sicher, da alles oder nichts übernommen wird
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                cells_data = json.load(f)
+            with transaction.atomic():
+                with django_connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL synchronous_commit = OFF")
+                
+                # Vorhandene UUIDs einmalig laden (nach TRUNCATE ist die Tabelle leer)
+                index_defs = []
+                if self._truncated:
+                    self._existing = set()
+                    index_defs = self._disable_indexes_and_triggers()
+                else:
+                    self._existing = set(Cells.objects.values_list('UUID', flat=True))
+                
+                self._preload_projects()
+                
+                # Zellen importieren (Gesamtzahl ist beim Streamen vorab unbekannt)
+                for rows, skipped, errors in self._iter_converted(pool):
+                    self.stats['total'] += len(rows) + skipped + errors
+                    self.stats['skipped'] += skipped
+                    self.stats['errors'] += errors
+                    
+                    for row in rows:
+                        # Zu lange Strings abweisen (das INSERT über das ORM ist daran gescheitert)
+                        too_long = next((COPY_COLUMNS[i] for i, max_length in MAX_LENGTHS
+                                         if isinstance(row[i], str) and len(row[i]) > max_length), None)
+                        if too_long:
+                            print(f"  ⚠ Fehler beim Importieren von {row[UUID_INDEX]}: {too_long} zu lang")
+                            self.stats['errors'] += 1
+                            continue
+                        
+                        # Prüfen ob Zelle bereits existiert (DB oder bereits gepuffert)
+                        # UUID ist in der DB nicht unique, daher hier deduplizieren
+                        uuid = row[UUID_INDEX]
+                        if uuid in self._existing:
+                            self.stats['skipped'] += 1
+                            continue
+                        self._existing.add(uuid)
+                        self._pending.append(row)
+                    
+                    if len(self._pending) >= COPY_CHUNK_SIZE:
+                        self._flush()
+                    
+                    # Progress anzeigen
+                    print(f"  Fortschritt: {self.stats['total']} "
+                          f"(Importiert: {self.stats['imported']}, "
+                          f"Übersprungen: {self.stats['skipped']}, "
+                          f"Fehler: {self.stats['errors']})")
+                
+                # Rest-Puffer schreiben
+                self._flush()
+                
+                if self._truncated:
+                    self._restore_indexes_and_triggers(index_defs)
         except Exception as e:
-            print(f"❌ Fehler beim Laden der JSON-Datei: {e}")
+            print(f"❌ Fehler beim Import, Transaktion zurückgerollt: {e}")
             return False
-        
-        self.stats['total'] = len(cells_data)
-        print(f"Gefunden: {self.stats['total']} Zellen\n")
-        
-        # Zellen importieren
-        for i, cell_data in enumerate(cells_data, 1):
-            self._import_cell(cell_data)
-            
-            # Progress anzeigen
-            if i % 1000 == 0:
-                print(f"  Fortschritt: {i}/{self.stats['total']} "
-                      f"(Importiert: {self.stats['imported']}, "
-                      f"Übersprungen: {self.stats['skipped']}, "
-                      f"Fehler: {self.stats['errors']})")
+        finally:
+            if pool is not None:
+                pool.terminate()
         
         # Finale Statistik
         print(f"\n=== Import abgeschlossen ===\n")
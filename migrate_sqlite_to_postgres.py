@@ -7,15 +7,24 @@ Automatische SQLite zu PostgreSQL Migration
 """
 
 import sqlite3
+import io
+import struct
+import ipaddress
 import psycopg2
 from psycopg2.extras import execute_values
 import os
 import sys
 import re
-from collections import defaultdict
-from datetime import datetime, timedelta
+import math
+from collections import defaultdict, deque, namedtuple
+from itertools import chain
+from datetime import datetime, timedelta, timezone
 import logging
+import threading
+from array import array
+from functools import lru_cache
 import uuid as uuid_lib
+from concurrent.futures import ThreadPoolExecutor
 
 # Django Models importieren (für PostgreSQL-Struktur)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -24,17 +33,59 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard.settings')
 import django
 django.setup()
 
-from django.db import connection as django_connection
+from django.db import connection as django_connection, transaction
 from megacellcnc.models import (
     Projects, Device, Slot, Cells, CellTestData, 
     Chemistry, Batteries, PrinterSettings
 )
 
+# Optional: rapidfuzz für die Namens-Ähnlichkeit (pip install rapidfuzz)
+try:
+    from rapidfuzz import fuzz
+except ImportError:
+    fuzz = None
+
 # Konfiguration
 # Pfad im Container: /data/MegaCellMonitor.sqlite (gemountet von /home/heinz/Dokumente/megacell/test)
 SQLITE_DB_PATH = os.environ.get('SQLITE_DB_PATH', "/data/MegaCellMonitor.sqlite")
 LOG_FILE = os.path.join(os.path.dirname(__file__), "migration_errors.log")
 
+# Zeilen pro COPY-Aufruf (begrenzt den Speicher des Puffers)
+COPY_CHUNK_SIZE = 50000
+# Ziel-Tabellen vor der Migration leeren (0 = vorhandene Zellen behalten und
+# bereits migrierte UUIDs überspringen, für wiederholte Läufe)
+MIGRATE_TRUNCATE = os.environ.get('MIGRATE_TRUNCATE', '1') != '0'
+# Parallele COPY-Verbindungen (1 = COPY über die Django-Verbindung in einer
+# Transaktion; > 1 ist schneller, aber ohne Rollback bei einem Abbruch)
+COPY_WORKERS = int(os.environ.get('MIGRATE_COPY_WORKERS', 1))
+# Zeilen pro execute_values()-Statement (Pfad mit RETURNING id)
+INSERT_PAGE_SIZE = 10000
+# Seitengröße wenn ein INSERT-Block fehlschlägt (erst seitenweise, dann einzeln)
+FALLBACK_PAGE_SIZE = 100
+# ID-Mapping als array statt dict, wenn die SQLite-IDs dicht genug liegen
+DENSE_ID_LIMIT = 10_000_000
+DENSE_ID_MIN_DENSITY = 0.5
+# Fortschritt alle N Zeilen ausgeben
+PROGRESS_EVERY = 10000
+# DEBUG-Ausgaben zur ersten (übersprungenen) Zeile
+MIGRATE_DEBUG = bool(os.environ.get('MIGRATE_DEBUG'))
+# Zeilen pro fetchmany() aus SQLite
+SQLITE_FETCH_SIZE = 10000
+# Zuletzt geparste Datums-Strings (gleiche Zeitstempel wiederholen sich oft)
+DATETIME_CACHE_SIZE = 4096
+
+# COPY BINARY: Signatur + Flags + Länge der Header-Erweiterung, Trailer = -1 Spalten
+BINARY_COPY_HEADER = b'PGCOPY\n\xff\r\n\0' + struct.pack('!ii', 0, 0)
+BINARY_COPY_TRAILER = struct.pack('!h', -1)
+# Datumsformate aus SQLite: 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM:SS' und mit Sekundenbruchteil
+_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?:[ T](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?)?')
+# Julian Day 2440587.5 = 1970-01-01 (SQLite julianday())
+JULIAN_DAY_UNIX_EPOCH = 2440587.5
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+# PostgreSQL zählt Zeitstempel in Mikrosekunden seit 2000-01-01
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
 # Logging konfigurieren
 logging.basicConfig(
     level=logging.ERROR,
@@ -45,12 +96,213 @@ logging.basicConfig(
     ]
 )
 
+# Spaltenplan pro Tabelle: einmal vor der Zeilenschleife aufgelöst
+ColumnPlan = namedtuple('ColumnPlan', [
+    'pg_col',    # Zielspalte
+    'src_idx',   # Position im SQLite-Tupel oder None
+    'static',    # fester Wert (CellLibrary) oder NO_STATIC
+    'dynamic',   # Funktion (row, col_idx) -> Wert (CellLibrary) oder None
+    'is_slot',   # slot_number aus cell_id/ChargerCell_id ableiten
+    'gen_uuid',  # UUID generieren wenn leer
+    'is_date',   # Datumswert konvertieren
+    'is_fk',     # Foreign Key auf neue ID mappen
+    'fk_ids',    # ID-Mapping der FK-Zieltabelle oder None (noch nicht migriert)
+    'required',  # Pflichtfeld (NOT NULL ohne Default)
+    'default',   # Default für Pflichtfeld, REQUIRED_UUID oder REQUIRED_SKIP
+    'direct',    # Wert unverändert aus row[src_idx] übernehmen ('' -> NULL)
+])
+NO_STATIC = object()
+REQUIRED_UUID = object()  # UUID pro Zeile generieren
+REQUIRED_SKIP = object()  # kein sinnvoller Default: Zeile überspringen
+
+
+def _copy_text_value(value):
+    """Formatiert einen Wert für COPY ... FROM STDIN (FORMAT text)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+@lru_cache(maxsize=DATETIME_CACHE_SIZE)
+def _parse_datetime_str(value):
+    """Parst einen SQLite Datums-String, None wenn kein bekanntes Format"""
+    m = _DATE_RE.fullmatch(value)
+    if m:
+        try:
+            year, month, day, hour, minute, second, fraction = m.groups()
+            if hour is None:
+                return datetime(int(year), int(month), int(day))
+            micro = int(fraction[:6].ljust(6, '0')) if fraction else 0
+            return datetime(int(year), int(month), int(day),
+                            int(hour), int(minute), int(second), micro)
+        except ValueError:
+            pass
+    
+    # Seltene Formate: strptime als Fallback
+    for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d']:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _row_value(row, col_idx, name, default=None):
+    """Liest eine Spalte per Name aus dem SQLite-Tupel (wie dict.get)"""
+    i = col_idx.get(name)
+    return default if i is None else row[i]
+
+
+def _pack_timestamp(value):
+    # Naive Werte als UTC behandeln (wie die Django-Verbindung mit USE_TZ)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - PG_EPOCH
+    return struct.pack('!iq', 8, (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def _pack_text(value):
+    data = str(value).encode('utf-8')
+    return struct.pack('!i', len(data)) + data
+
+
+def _pack_inet(value):
+    addr = ipaddress.ip_address(value)
+    packed = addr.packed
+    family = 2 if addr.version == 4 else 3  # PGSQL_AF_INET / PGSQL_AF_INET6
+    return struct.pack('!iBBBB', 4 + len(packed), family, addr.max_prefixlen, 0, len(packed)) + packed
+
+
+def _to_int(value):
+    """Ganzzahl wie PostgreSQL bei numeric -> integer (kaufmännisch runden statt abschneiden)"""
+    if isinstance(value, float):
+        return int(math.copysign(math.floor(abs(value) + 0.5), value))
+    if isinstance(value, int):
+        return value
+    # Strings u.ä. nicht raten - Zeile geht in den Fallback
+    raise TypeError(f"Kein Ganzzahlwert: {value!r}")
+
+
+# Texteingaben, die PostgreSQL für boolean akzeptiert
+BOOL_TRUE_STRINGS = {'t', 'true', 'y', 'yes', 'on', '1'}
+BOOL_FALSE_STRINGS = {'f', 'false', 'n', 'no', 'off', '0'}
+
+
+def _to_bool(value):
+    """Boolean aus SQLite-Wert; Strings wie '0'/'false' sind False"""
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in BOOL_TRUE_STRINGS:
+            return True
+        if text in BOOL_FALSE_STRINGS:
+            return False
+        raise ValueError(f"Ungültiger boolean-Wert: {value!r}")
+    return bool(value)
+
+
+def _pack_date(value):
+    # _convert_datetime liefert datetime, die Spalte braucht nur das Datum
+    if isinstance(value, datetime):
+        value = value.date()
+    return struct.pack('!ii', 4, (value - PG_EPOCH.date()).days)
+
+
+def _pack_interval(value):
+    # Mikrosekunden, Tage, Monate
+    micros = (value.seconds * 1000000) + value.microseconds
+    return struct.pack('!iqii', 16, micros, value.days, 0)
+
+
+# data_type aus information_schema -> Packer für COPY BINARY
+BINARY_PACKERS = {
+    'smallint': lambda v: struct.pack('!ih', 2, _to_int(v)),
+    'integer': lambda v: struct.pack('!ii', 4, _to_int(v)),
+    'bigint': lambda v: struct.pack('!iq', 8, _to_int(v)),
+    'real': lambda v: struct.pack('!if', 4, float(v)),
+    'double precision': lambda v: struct.pack('!id', 8, float(v)),
+    'boolean': lambda v: struct.pack('!i?', 1, _to_bool(v)),
+    'character varying': _pack_text,
+    'character': _pack_text,
+    'text': _pack_text,
+    'timestamp with time zone': _pack_timestamp,
+    'timestamp without time zone': _pack_timestamp,
+    'date': _pack_date,
+    'inet': _pack_inet,
+    'interval': _pack_interval,
+}
+NULL_FIELD = struct.pack('!i', -1)
+
+
+def _pack_row(pg_col_types, values):
+    """Packt eine Zeile im COPY BINARY Format"""
+    parts = [struct.pack('!h', len(values))]
+    for col_type, value in zip(pg_col_types, values):
+        if value is None:
+            parts.append(NULL_FIELD)
+        else:
+            parts.append(BINARY_PACKERS[col_type](value))
+    return b''.join(parts)
+
+
+class DenseIdMap:
+    """Alte ID -> neue ID für dichte Integer-IDs (array statt dict)
+    
+    0 steht für "nicht gemappt" (Postgres-IDs beginnen bei 1). IDs außerhalb
+    des Bereichs landen in einem normalen dict.
+    """
+    
+    def __init__(self, max_id):
+        self._ids = array('q', bytes(8 * (max_id + 1)))
+        self._overflow = {}
+    
+    def _in_range(self, old_id):
+        return isinstance(old_id, int) and 0 <= old_id < len(self._ids)
+    
+    def __setitem__(self, old_id, new_id):
+        if self._in_range(old_id):
+            self._ids[old_id] = new_id
+        else:
+            self._overflow[old_id] = new_id
+    
+    def __contains__(self, old_id):
+        if self._in_range(old_id):
+            return self._ids[old_id] != 0
+        return old_id in self._overflow
+    
+    def __getitem__(self, old_id):
+        if self._in_range(old_id):
+            new_id = self._ids[old_id]
+            if new_id:
+                return new_id
+            raise KeyError(old_id)
+        return self._overflow[old_id]
+    
+    def get(self, old_id, default=None):
+        if self._in_range(old_id):
+            return self._ids[old_id] or default
+        return self._overflow.get(old_id, default)
+
+
 class SQLiteAnalyzer:
     """Analysiert SQLite-Datenbankstruktur"""
     
     def __init__(self, db_path):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Nur lesend: keine impliziten Transaktionen, Tupel als Zeilen
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.row_factory = None
+        # Scan der ganzen DB: Seiten per mmap lesen, 256 MB Page-Cache
+        self.conn.execute('PRAGMA mmap_size=1073741824')
+        self.conn.execute('PRAGMA cache_size=-262144')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
         self.tables = {}
         self.foreign_keys = {}
         
@@ -65,13 +317,10 @@ class SQLiteAnalyzer:
         
         print(f"Gefundene Tabellen: {', '.join(table_names)}\n")
         
-        # Jede Tabelle analysieren
+        # Jede Tabelle analysieren (inkl. Foreign Keys)
         for table_name in table_names:
             self.tables[table_name] = self._analyze_table(table_name)
         
-        # Foreign Keys analysieren
-        self._analyze_foreign_keys()
-        
         return self.tables
     
     def _analyze_table(self, table_name):
@@ -90,9 +339,20 @@ class SQLiteAnalyzer:
                 'primary_key': pk
             }
         
-        # Anzahl Zeilen
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        row_count = cursor.fetchone()[0]
+        # Foreign Keys im selben Durchlauf
+        cursor.execute(f"PRAGMA foreign_key_list({table_name})")
+        fks = cursor.fetchall()
+        if fks:
+            self.foreign_keys[table_name] = fks
+        
+        # Ungefähre Anzahl Zeilen: MAX(rowid) ist O(1), COUNT(*) wäre ein Full Scan
+        # (stimmt exakt solange nichts gelöscht wurde)
+        try:
+            cursor.execute(f"SELECT MAX(rowid) FROM {table_name}")
+            row_count = cursor.fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            # WITHOUT ROWID Tabelle
+            row_count = None
         
         # Beispiel-Daten (erste Zeile)
         cursor.execute(f"SELECT * FROM {table_name} LIMIT 1")
@@ -109,22 +369,16 @@ class SQLiteAnalyzer:
             'sample': sample_data
         }
     
-    def _analyze_foreign_keys(self):
-        """Analysiert Foreign Key Beziehungen"""
-        cursor = self.conn.cursor()
-        for table_name in self.tables.keys():
-            cursor.execute(f"PRAGMA foreign_key_list({table_name})")
-            fks = cursor.fetchall()
-            if fks:
-                self.foreign_keys[table_name] = fks
-    
-    def get_data(self, table_name):
-        """Holt alle Daten einer Tabelle"""
+    def iter_data(self, table_name, chunk_size=SQLITE_FETCH_SIZE):
+        """Liefert die Daten einer Tabelle blockweise als (columns, rows_chunk)"""
         cursor = self.conn.cursor()
         cursor.execute(f"SELECT * FROM {table_name}")
         columns = [desc[0] for desc in cursor.description]
-        rows = cursor.fetchall()
-        return columns, rows
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield columns, rows
     
     def close(self):
         self.conn.close()
@@ -147,15 +401,21 @@ class AutoMapper:
     
     def __init__(self, sqlite_tables):
         self.sqlite_tables = sqlite_tables
+        # Normalisierter Name -> SQLite-Tabelle für exakte Treffer ohne Scoring
+        self.sqlite_lower = {
+            name.lower().replace('megacellcnc_', ''): name for name in sqlite_tables
+        }
         self.mapping = {}
         self.column_mapping = {}
+        self.pg_tables = {}
         
     def create_mapping(self):
         """Erstellt automatisches Mapping"""
         print("\n=== Erstelle automatisches Mapping ===\n")
         
-        # PostgreSQL Tabellen-Struktur holen
+        # PostgreSQL Tabellen-Struktur holen (Typen werden für COPY BINARY gebraucht)
         pg_tables = self._get_postgres_tables()
+        self.pg_tables = pg_tables
         
         # Für jede PostgreSQL-Tabelle passende SQLite-Tabelle finden
         for pg_table, pg_columns in pg_tables.items():
@@ -220,8 +480,12 @@ class AutoMapper:
         if pg_table in self.sqlite_tables:
             return pg_table
         
-        # Ähnliche Namen finden
+        # Gleicher Name (case-insensitive, ohne App-Präfix)
         pg_name_clean = pg_table.replace('megacellcnc_', '').lower()
+        if pg_name_clean in self.sqlite_lower:
+            return self.sqlite_lower[pg_name_clean]
+        
+        # Ähnliche Namen finden
         best_match = None
         best_score = 0
         
@@ -249,6 +513,9 @@ class AutoMapper:
             return 1.0
         if str1 in str2 or str2 in str1:
             return 0.8
+        if fuzz is not None:
+            # Levenshtein (normalisiert auf 0..1)
+            return fuzz.ratio(str1, str2) / 100.0
         # Levenshtein-ähnlich (vereinfacht)
         common_chars = len(set(str1) & set(str2))
         return common_chars / max(len(str1), len(str2)) if max(len(str1), len(str2)) > 0 else 0
@@ -372,12 +639,86 @@ class DataMigrator:
         'insert_date', 'CreationDate', 'created_at', 'updated_at'
     ]
     
+    # CellLibrary -> megacellcnc_cells: feste Werte pro Spalte
+    CELLLIB_STATIC = {
+        # Immer auf 18650 setzen (aktuell nur dieser Type verwendet)
+        'cell_type': '18650',
+        'device_mac': '00:00:00:00:00:00',
+        'charge_duration': 0.0,
+        'discharge_duration': 0.0,
+        'avg_temp_charging': 0,
+        'avg_temp_discharging': 0,
+        'max_temp_charging': 0,
+        'max_temp_discharging': 0,
+        'testing_current': 0,
+        'discharge_mode': 'CC',
+        'status': 'Completed',
+        'bat_position': '',
+        'battery_id': None,
+        'removal_date': None,
+    }
+    
+    # CellLibrary -> megacellcnc_cells: Werte aus der Zeile bzw. dem Pre-Processing
+    CELLLIB_DYNAMIC = {
+        'project_id': lambda row, col_idx: row[col_idx['_project_id']],
+        'UUID': lambda row, col_idx: row[col_idx['_uuid']],
+        'available': lambda row, col_idx: row[col_idx['_available']],
+        # Versuche aus charger_icc zu holen, sonst Default
+        'device_ip': lambda row, col_idx: _row_value(row, col_idx, 'charger_icc', '192.168.1.33'),
+        # Aus CCiD holen
+        'device_slot': lambda row, col_idx: _row_value(row, col_idx, 'CCiD', 0),
+        'device_type': lambda row, col_idx: _row_value(row, col_idx, 'charger_type', 'Unknown'),
+    }
+    
+    # Projekt für Zellen ohne ProjectName
+    DEFAULT_PROJECT_NAME = 'Importierte Zellen'
+    
+    # Defaults für automatisch angelegte Projects
+    PROJECT_DEFAULTS = {
+        'CellType': 'not specified',
+        'Notes': 'Automatisch importiert aus SQLite',
+        'LastCellNumber': 0,
+        'Status': 'Active',
+        'TotalCells': 0,
+        'DevCnt': 0
+    }
+    
+    # Defaults für Pflichtfelder ohne Wert (REQUIRED_UUID / REQUIRED_SKIP als Marker)
+    REQUIRED_DEFAULTS = {
+        'UUID': REQUIRED_UUID,
+        **dict.fromkeys(['voltage', 'capacity', 'esr', 'esr_ac', 'min_voltage', 'max_voltage', 'store_voltage', 'store_Voltage'], 0.0),
+        **dict.fromkeys(['test_duration', 'charge_duration', 'discharge_duration', 'action_running_time'], 0.0),
+        **dict.fromkeys(['device_slot', 'cycles_count', 'testing_current', 'discharge_cycles_set', 'completed_cycles'], 0),
+        **dict.fromkeys(['temp_before_test', 'avg_temp_charging', 'avg_temp_discharging', 'max_temp_charging', 'max_temp_discharging'], 0),
+        **dict.fromkeys(['max_capacity', 'chg_current', 'pre_chg_current', 'ter_chg_current', 'discharge_current', 'discharge_resistance', 'discharge_mod', 'max_temp', 'low_volt_max_time', 'max_charge_duration', 'discharge_cycles'], 0),
+        **dict.fromkeys(['status', 'available', 'cell_type', 'device_type', 'discharge_mode', 'name'], 'Unknown'),
+        **dict.fromkeys(['device_ip', 'ip'], '0.0.0.0'),
+        **dict.fromkeys(['device_mac', 'mac'], '00:00:00:00:00:00'),
+        'type': 'Unknown',
+        'bat_position': '',
+        # DurationField braucht ein timedelta
+        'runtime': timedelta(0),
+        # Foreign Key - überspringe Zeile wenn nicht vorhanden
+        **dict.fromkeys(['project_id', 'device_id'], REQUIRED_SKIP),
+    }
+    
     def __init__(self, sqlite_analyzer, mapper):
         self.sqlite_analyzer = sqlite_analyzer
         self.mapper = mapper
         self.id_mapping = defaultdict(dict)  # Alte ID -> Neue ID Mapping
         self.pg_date_columns = {}  # Cache für Datumsspalten pro Tabelle
+        self._required_cache = {}  # Cache für Pflichtfelder pro Tabelle
+        self._pk_cache = {}  # Cache für Primary-Key-Spalten pro Tabelle
+        self._actual_cols_cache = {}  # Cache für tatsächliche Spaltennamen pro Tabelle
+        self.col_types = {}  # Cache für data_type pro Spalte und Tabelle
+        self.fk_target = {}  # FK-Spalte -> Tabelle aus MIGRATION_ORDER (oder None)
         self.project_cache = {}  # Cache für Projects (ProjectName -> project_id)
+        self._truncated = False
+        self._today_str = datetime.now().strftime('%Y%m%d')  # Fallback-Datum für UUIDs
+        self._logdate_cache = {}  # Cache Tagespräfix 'YYYY-MM-DD' aus LogDate -> 'YYYYMMDD'
+        self._copy_local = threading.local()  # eigene DB-Verbindung pro COPY-Thread
+        self._copy_connections = []
+        self._copy_connections_lock = threading.Lock()
     
     def _truncate_tables(self):
         """Leert Ziel-Tabellen vor Migration"""
@@ -389,29 +730,52 @@ class DataMigrator:
             
             cursor.execute("TRUNCATE TABLE megacellcnc_projects CASCADE;")
             print("  ✓ megacellcnc_projects geleert")
-            
-            django_connection.commit()
+        self._truncated = True
+    
+    def _load_existing_uuids(self, pg_table):
+        """Lädt die bereits vorhandenen UUIDs (UUID ist nicht unique, daher kein ON CONFLICT)"""
+        with django_connection.cursor() as cursor:
+            cursor.execute(f'SELECT "UUID" FROM {pg_table}')
+            return {row[0] for row in cursor.fetchall()}
+    
+    def _normalize_project_name(self, project_name):
+        """Leere ProjectNames landen im Default-Projekt"""
+        if not project_name or project_name.strip() == '':
+            return self.DEFAULT_PROJECT_NAME
+        return project_name
+    
+    def _preload_projects(self, sqlite_table):
+        """Lädt/erstellt alle Projects der SQLite-Tabelle vorab in project_cache"""
+        cursor = self.sqlite_analyzer.conn.cursor()
+        cursor.execute(f"SELECT DISTINCT ProjectName FROM {sqlite_table}")
+        names = {self._normalize_project_name(row[0]) for row in cursor.fetchall()}
+        
+        # Bestehende Projects (bei doppelten Namen gewinnt das älteste)
+        existing = Projects.objects.filter(Name__in=names).order_by('id').values_list('Name', 'id')
+        for name, project_id in existing:
+            self.project_cache.setdefault(name, project_id)
+        
+        missing = names - self.project_cache.keys()
+        if missing:
+            created = Projects.objects.bulk_create(
+                [Projects(Name=name, **self.PROJECT_DEFAULTS) for name in sorted(missing)]
+            )
+            for project in created:
+                self.project_cache[project.Name] = project.id
+                print(f"  ✓ Project '{project.Name}' erstellt (ID: {project.id})")
     
     def _ensure_project(self, project_name):
         """Erstellt Project falls nicht vorhanden, gibt project_id zurück"""
-        if not project_name or project_name.strip() == '':
-            project_name = 'Importierte Zellen'
+        project_name = self._normalize_project_name(project_name)
         
-        # Cache prüfen
+        # Cache prüfen (wird von _preload_projects gefüllt)
         if project_name in self.project_cache:
             return self.project_cache[project_name]
         
         # Prüfe ob Project existiert oder erstelle es
         project, created = Projects.objects.get_or_create(
             Name=project_name,
-            defaults={
-                'CellType': 'not specified',
-                'Notes': 'Automatisch importiert aus SQLite',
-                'LastCellNumber': 0,
-                'Status': 'Active',
-                'TotalCells': 0,
-                'DevCnt': 0
-            }
+            defaults=self.PROJECT_DEFAULTS
         )
         
         self.project_cache[project_name] = project.id
@@ -430,9 +794,37 @@ class DataMigrator:
             return 'Yes'
     
     def migrate(self):
-        """Führt die Migration durch"""
+        """Führt die Migration durch
+        
+        Mit einer Verbindung (MIGRATE_COPY_WORKERS=1) läuft alles in einer
+        Transaktion: bei einem Abbruch bleibt die Ziel-DB unverändert. Parallele
+        COPY-Verbindungen müssen Projects und gelöschte Indizes aber committed
+        sehen, dann wird ohne äußere Transaktion migriert.
+        """
+        if COPY_WORKERS > 1:
+            # Auf Session-Ebene: die Django-Verbindung baut auch die Indizes neu auf
+            with django_connection.cursor() as cursor:
+                cursor.execute("SET synchronous_commit = OFF")
+                cursor.execute("SET work_mem = '256MB'")
+                cursor.execute("SET maintenance_work_mem = '1GB'")
+            self._migrate_tables()
+            return
+        
+        with transaction.atomic():
+            with django_connection.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit = OFF")
+                cursor.execute("SET LOCAL work_mem = '256MB'")
+                # Für den Neuaufbau der Indizes nach dem COPY
+                cursor.execute("SET LOCAL maintenance_work_mem = '1GB'")
+            self._migrate_tables()
+    
+    def _migrate_tables(self):
+        """Leert die Ziel-Tabellen und migriert in MIGRATION_ORDER"""
         # Tabellen leeren VOR Migration
-        self._truncate_tables()
+        if MIGRATE_TRUNCATE:
+            self._truncate_tables()
+        else:
+            print("\n=== Ziel-Tabellen werden nicht geleert, vorhandene UUIDs werden übersprungen ===")
         
         print("\n=== Starte Daten-Migration ===\n")
         
@@ -443,38 +835,55 @@ class DataMigrator:
             else:
                 print(f"⚠ Überspringe {pg_table} (kein Mapping)")
     
-    def _get_date_columns(self, pg_table):
-        """Ermittelt Datumsspalten für eine Tabelle"""
-        if pg_table in self.pg_date_columns:
-            return self.pg_date_columns[pg_table]
-        
+    def _load_column_info(self, pg_table):
+        """Liest Spalten, Pflichtfelder und Datumsspalten mit einer Abfrage"""
         with django_connection.cursor() as cursor:
             cursor.execute("""
-                SELECT column_name, data_type
+                SELECT column_name, data_type, is_nullable, column_default, ordinal_position
                 FROM information_schema.columns
                 WHERE table_name = %s
-                AND (data_type LIKE '%%timestamp%%' OR data_type LIKE '%%date%%')
+                ORDER BY ordinal_position
             """, [pg_table])
-            date_cols = {row[0]: row[1] for row in cursor.fetchall()}
-            self.pg_date_columns[pg_table] = date_cols
-            return date_cols
+            rows = cursor.fetchall()
+        
+        self._actual_cols_cache[pg_table] = {row[0]: row[0] for row in rows}
+        self.col_types[pg_table] = {row[0]: row[1] for row in rows}
+        # Pflichtfelder: NOT NULL ohne Default
+        self._required_cache[pg_table] = [
+            row[0] for row in rows
+            if row[2] == 'NO' and row[3] is None and row[0] != 'id'
+        ]
+        self.pg_date_columns[pg_table] = {
+            row[0]: row[1] for row in rows
+            if 'timestamp' in row[1] or 'date' in row[1]
+        }
+    
+    def _get_actual_columns(self, pg_table):
+        """Ermittelt die tatsächlichen Spaltennamen einer Tabelle"""
+        if pg_table not in self._actual_cols_cache:
+            self._load_column_info(pg_table)
+        return self._actual_cols_cache[pg_table]
+    
+    def _get_column_types(self, pg_table):
+        """Ermittelt data_type pro Spalte einer Tabelle"""
+        if pg_table not in self.col_types:
+            self._load_column_info(pg_table)
+        return self.col_types[pg_table]
+    
+    def _get_date_columns(self, pg_table):
+        """Ermittelt Datumsspalten für eine Tabelle"""
+        if pg_table not in self.pg_date_columns:
+            self._load_column_info(pg_table)
+        return self.pg_date_columns[pg_table]
     
     def _convert_datetime(self, value, column_name):
         """Konvertiert SQLite Datumswert zu PostgreSQL TIMESTAMP"""
         if value is None or value == '':
             return None
         
-        # Wenn bereits String/DateTime, direkt zurückgeben
+        # Strings über den Cache parsen (Ergebnis hängt nur vom String ab)
         if isinstance(value, str):
-            try:
-                # Versuche verschiedene Datumsformate zu parsen
-                for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d']:
-                    try:
-                        return datetime.strptime(value, fmt)
-                    except ValueError:
-                        continue
-            except:
-                pass
+            return _parse_datetime_str(value)
         
         if isinstance(value, (datetime,)):
             return value
@@ -493,11 +902,9 @@ class DataMigrator:
                         return datetime.fromtimestamp(value / 1000)
                     else:
                         # Möglicherweise Julian Day (SQLite Format)
-                        # Julian Day 2440587.5 = 1970-01-01
-                        julian_day_epoch = 2440587.5
-                        days = value - julian_day_epoch
+                        days = value - JULIAN_DAY_UNIX_EPOCH
                         try:
-                            result = datetime(1970, 1, 1) + timedelta(days=days)
+                            result = UNIX_EPOCH + timedelta(days=days)
                             # Prüfe auf gültigen Datumsbereich
                             if result.year < 1900 or result.year > 2100:
                                 return None
@@ -510,91 +917,409 @@ class DataMigrator:
         
         return None
     
-    def _generate_uuid(self, row_dict, pg_table):
-        """Generiert UUID für Zellen wenn fehlend"""
+    def _logdate_str(self, log_date):
+        """LogDate als 'YYYYMMDD', Fallback auf das aktuelle Datum wenn Parsing fehlschlägt"""
+        # Nur das Datum zählt: Cache über den Tagespräfix (wenige verschiedene Tage),
+        # aber nur wenn der String mit einem zweistelligen 'YYYY-MM-DD' beginnt
+        if isinstance(log_date, str) and _DATE_RE.match(log_date):
+            day = log_date[:10]
+            date_str = self._logdate_cache.get(day)
+            if date_str is None:
+                date_obj = self._convert_datetime(day, 'LogDate')
+                date_str = date_obj.strftime('%Y%m%d') if date_obj else self._today_str
+                self._logdate_cache[day] = date_str
+            return date_str
+        date_obj = self._convert_datetime(log_date, 'LogDate')
+        return date_obj.strftime('%Y%m%d') if date_obj else self._today_str
+    
+    def _generate_uuid(self, cell_serial, log_date, pg_table):
+        """Generiert UUID für Zellen wenn fehlend (aus CellSerialNumber und LogDate)"""
         if pg_table == 'megacellcnc_cells':
-            # Versuche UUID aus CellSerialNumber und LogDate zu generieren
-            cell_serial = row_dict.get('CellSerialNumber')
-            log_date = row_dict.get('LogDate')
-            
             if cell_serial and log_date:
                 # Parse LogDate und formatiere als D{YYYYMMDD}
-                date_obj = self._convert_datetime(log_date, 'LogDate')
-                if date_obj:
-                    date_str = date_obj.strftime('%Y%m%d')
-                else:
-                    # Fallback auf aktuelles Datum wenn Parsing fehlschlägt
-                    date_str = datetime.now().strftime('%Y%m%d')
+                date_str = self._logdate_str(log_date)
                 return f"D{date_str}-S{int(cell_serial):06d}"
             elif cell_serial:
                 # Nur SerialNumber ohne LogDate
-                date_str = datetime.now().strftime('%Y%m%d')
-                return f"D{date_str}-S{int(cell_serial):06d}"
+                return f"D{self._today_str}-S{int(cell_serial):06d}"
             # Fallback: UUID generieren
             return f"MIGRATED-{uuid_lib.uuid4().hex[:12].upper()}"
         elif pg_table == 'megacellcnc_batteries':
             # Batterie UUID generieren
-            date_str = datetime.now().strftime('%Y%m%d')
-            return f"B{date_str}-{uuid_lib.uuid4().hex[:8].upper()}"
+            return f"B{self._today_str}-{uuid_lib.uuid4().hex[:8].upper()}"
         return None
     
+    def _get_pk_columns(self, pg_table):
+        """Ermittelt die Primary-Key-Spalten einer Tabelle"""
+        if pg_table not in self._pk_cache:
+            with django_connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT kcu.column_name
+                    FROM information_schema.table_constraints tc
+                    JOIN information_schema.key_column_usage kcu
+                      ON kcu.constraint_name = tc.constraint_name
+                     AND kcu.table_schema = tc.table_schema
+                    WHERE tc.table_name = %s
+                    AND tc.constraint_type = 'PRIMARY KEY'
+                    ORDER BY kcu.ordinal_position
+                """, [pg_table])
+                self._pk_cache[pg_table] = [row[0] for row in cursor.fetchall()]
+        return self._pk_cache[pg_table]
+    
     def _get_required_columns(self, pg_table):
         """Ermittelt Pflichtfelder (NOT NULL ohne Default)"""
+        if pg_table not in self._required_cache:
+            self._load_column_info(pg_table)
+        return self._required_cache[pg_table]
+    
+    def _drop_indexes(self, pg_table):
+        """Entfernt Sekundär-Indizes vor dem Bulk-Load, gibt die Definitionen zurück"""
         with django_connection.cursor() as cursor:
+            # Alle Indizes außer Primary Key / Unique (diese hängen an Constraints)
             cursor.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = %s
-                AND is_nullable = 'NO'
-                AND column_default IS NULL
-                AND column_name != 'id'
+                SELECT i.relname, pg_get_indexdef(i.oid)
+                FROM pg_index x
+                JOIN pg_class i ON i.oid = x.indexrelid
+                WHERE x.indrelid = %s::regclass
+                AND NOT x.indisprimary
+                AND NOT x.indisunique
             """, [pg_table])
-            return [row[0] for row in cursor.fetchall()]
+            indexes = cursor.fetchall()
+            
+            for index_name, _ in indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {django_connection.ops.quote_name(index_name)}")
+        if indexes:
+            print(f"  ✓ {len(indexes)} Indizes von {pg_table} entfernt")
+        return [index_def for _, index_def in indexes]
+    
+    def _restore_indexes(self, pg_table, index_defs):
+        """Legt die mit _drop_indexes entfernten Indizes neu an"""
+        with django_connection.cursor() as cursor:
+            for index_def in index_defs:
+                cursor.execute(index_def)
+        if index_defs:
+            print(f"  ✓ {len(index_defs)} Indizes von {pg_table} neu erstellt")
+    
+    def _new_id_mapping(self, sqlite_table):
+        """array-basiertes Mapping für dichte IDs, sonst dict"""
+        # MAX(id) über den Index (bei INTEGER PRIMARY KEY = rowid), kein COUNT-Scan:
+        # Zeilenzahl aus der Analyse (MAX(rowid)) verwenden
+        cursor = self.sqlite_analyzer.conn.cursor()
+        cursor.execute(f"SELECT MAX(id) FROM {sqlite_table}")
+        max_id = cursor.fetchone()[0]
+        id_count = self.sqlite_analyzer.tables.get(sqlite_table, {}).get('row_count')
+        if (isinstance(max_id, int) and 0 < max_id < DENSE_ID_LIMIT
+                and id_count and id_count / max_id > DENSE_ID_MIN_DENSITY):
+            return DenseIdMap(max_id)
+        return {}
+    
+    def _get_fk_ids(self, target):
+        """ID-Mapping einer FK-Zieltabelle, bei Bedarf einmal aus PostgreSQL geladen
+        
+        Fehlt das Mapping (Tabelle per COPY geladen oder in einem früheren Lauf
+        migriert), aber die SQLite-ID wurde 1:1 in die Spalte id übernommen, dann
+        ist das Mapping die Identität der vorhandenen IDs.
+        """
+        fk_ids = self.id_mapping.get(target)
+        if fk_ids is not None:
+            return fk_ids
+        sqlite_table = self.mapper.mapping.get(target)
+        if not sqlite_table or self.mapper.column_mapping.get(target, {}).get('id') != 'id':
+            return None
+        fk_ids = self._new_id_mapping(sqlite_table)
+        with django_connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {target}")
+            for (pg_id,) in cursor.fetchall():
+                fk_ids[pg_id] = pg_id
+        self.id_mapping[target] = fk_ids
+        return fk_ids
+    
+    def _required_default(self, pg_col, col_type):
+        """Default für ein Pflichtfeld ohne Wert (REQUIRED_UUID / REQUIRED_SKIP als Marker)"""
+        if pg_col in self.REQUIRED_DEFAULTS:
+            return self.REQUIRED_DEFAULTS[pg_col]
+        
+        # Versuche generische Defaults basierend auf Typ
+        if col_type:
+            if 'int' in col_type.lower():
+                return 0
+            elif 'float' in col_type.lower() or 'double' in col_type.lower() or 'numeric' in col_type.lower():
+                return 0.0
+            elif 'char' in col_type.lower() or 'text' in col_type.lower():
+                return ''
+            elif 'bool' in col_type.lower():
+                return False
+        return REQUIRED_SKIP
+    
+    def _fk_target_table(self, fk_col):
+        """Findet die Zieltabelle einer FK-Spalte (z.B. project_id -> megacellcnc_projects)"""
+        if fk_col not in self.fk_target:
+            fk_table = fk_col.replace('_id', '')
+            self.fk_target[fk_col] = next(
+                (table for table in self.MIGRATION_ORDER
+                 if fk_table in table or table.endswith(f'_{fk_table}')),
+                None
+            )
+        return self.fk_target[fk_col]
+    
+    def _build_column_plan(self, pg_table, sqlite_table, pg_columns, col_mapping, col_idx, is_celllib):
+        """Löst pro Spalte einmal auf, was in der Zeilenschleife zu tun ist"""
+        required_columns = self._get_required_columns(pg_table)
+        date_columns = self._get_date_columns(pg_table)
+        col_types = self._get_column_types(pg_table)
+        
+        plan = []
+        for pg_col in pg_columns:
+            # Leere Strings als "kein Mapping" behandeln
+            sqlite_col = col_mapping.get(pg_col) or None
+            required = pg_col in required_columns
+            # Für CellLibrary: project_id wird im Pre-Processing gesetzt, nicht überschreiben
+            is_fk = pg_col.endswith('_id') and not (sqlite_table == 'CellLibrary' and pg_col == 'project_id')
+            # Mapping-Dict der Zieltabelle direkt merken (eine Suche pro Zelle statt zwei)
+            fk_target = self._fk_target_table(pg_col) if is_fk else None
+            spec = ColumnPlan(
+                pg_col=pg_col,
+                src_idx=col_idx.get(sqlite_col) if sqlite_col else None,
+                static=self.CELLLIB_STATIC[pg_col] if is_celllib and pg_col in self.CELLLIB_STATIC else NO_STATIC,
+                dynamic=self.CELLLIB_DYNAMIC.get(pg_col) if is_celllib else None,
+                is_slot=pg_col == 'slot_number',
+                gen_uuid=pg_col == 'UUID' and required,
+                is_date=pg_col in date_columns,
+                is_fk=is_fk,
+                fk_ids=self._get_fk_ids(fk_target) if fk_target and fk_target != pg_table else self.id_mapping.get(fk_target),
+                required=required,
+                default=self._required_default(pg_col, col_types.get(pg_col)) if required else None,
+                direct=False,
+            )
+            # Spalten ohne Sonderbehandlung: nur Position im Tupel lesen
+            direct = (spec.src_idx is not None and spec.static is NO_STATIC and spec.dynamic is None
+                      and not (spec.is_slot or spec.gen_uuid or spec.is_date or spec.is_fk or required))
+            plan.append(spec._replace(direct=direct))
+        return plan
+    
+    def _needs_id_mapping(self, pg_table):
+        """Prüft ob spätere Tabellen die neuen IDs dieser Tabelle brauchen"""
+        if pg_table not in self.MIGRATION_ORDER:
+            return False
+        later_tables = self.MIGRATION_ORDER[self.MIGRATION_ORDER.index(pg_table) + 1:]
+        return any(table in self.mapper.mapping for table in later_tables)
+    
+    def _dedupe_rows(self, rows, pk_pos, old_ids=None):
+        """Entfernt doppelte Primary Keys innerhalb eines Blocks (letzte Zeile gewinnt)
+        
+        Gibt (rows, old_ids, Anzahl entfernter Zeilen) zurück.
+        """
+        if len(pk_pos) == 1:
+            pos = pk_pos[0]
+            keys = [values[pos] for values in rows]
+        else:
+            keys = [tuple(values[pos] for pos in pk_pos) for values in rows]
+        # Index der letzten Zeile pro Key, Eingabereihenfolge der behaltenen Zeilen bleibt
+        last = dict(zip(keys, range(len(rows))))
+        if len(last) == len(rows):
+            return rows, old_ids, 0
+        keep = sorted(last.values())
+        dropped = len(rows) - len(keep)
+        deduped_rows = [rows[i] for i in keep]
+        if old_ids is None:
+            return deduped_rows, None, dropped
+        return deduped_rows, [old_ids[i] for i in keep], dropped
+    
+    def _insert_rows(self, cursor, pg_table, cols_str, rows, old_ids):
+        """Fügt Zeilen per execute_values ein und speichert das ID-Mapping"""
+        sql = f"INSERT INTO {pg_table} ({cols_str}) VALUES %s RETURNING id"
+        try:
+            # Savepoint, damit ein Fehler die Migrations-Transaktion nicht abbricht
+            with transaction.atomic():
+                # Roher psycopg2-Cursor, execute_values arbeitet mit mogrify
+                result = execute_values(cursor.cursor, sql, rows, page_size=INSERT_PAGE_SIZE, fetch=True)
+        except Exception as e:
+            print(f"  ⚠ INSERT von {len(rows)} Zeilen in {pg_table} fehlgeschlagen, seitenweise: {e}")
+            return self._insert_rows_paged(cursor, pg_table, cols_str, rows, old_ids)
+        
+        # RETURNING liefert die IDs in der Reihenfolge der VALUES
+        for old_id, (new_id,) in zip(old_ids, result):
+            if old_id:
+                self.id_mapping[pg_table][old_id] = new_id
+        return len(result)
+    
+    def _insert_rows_paged(self, cursor, pg_table, cols_str, rows, old_ids):
+        """Fallback: kleine Seiten per execute_values, nur fehlerhafte Seiten einzeln"""
+        sql = f"INSERT INTO {pg_table} ({cols_str}) VALUES %s RETURNING id"
+        inserted = 0
+        for start in range(0, len(rows), FALLBACK_PAGE_SIZE):
+            page = rows[start:start + FALLBACK_PAGE_SIZE]
+            page_old_ids = old_ids[start:start + FALLBACK_PAGE_SIZE]
+            try:
+                with transaction.atomic():
+                    result = execute_values(cursor.cursor, sql, page, page_size=FALLBACK_PAGE_SIZE, fetch=True)
+            except Exception:
+                inserted += self._insert_rows_singly(cursor, pg_table, cols_str, page, page_old_ids)
+                continue
+            for old_id, (new_id,) in zip(page_old_ids, result):
+                if old_id:
+                    self.id_mapping[pg_table][old_id] = new_id
+            inserted += len(result)
+        return inserted
+    
+    def _insert_rows_singly(self, cursor, pg_table, cols_str, rows, old_ids):
+        """Fallback: Zeilen einzeln einfügen, damit nur fehlerhafte Zeilen fehlen"""
+        placeholders = ','.join(['%s'] * len(rows[0]))
+        # Einzelne Zeilen: Duplikate (z.B. mit MIGRATE_TRUNCATE=0) still überspringen
+        sql = f"INSERT INTO {pg_table} ({cols_str}) VALUES ({placeholders}) ON CONFLICT DO NOTHING RETURNING id"
+        inserted = 0
+        for values, old_id in zip(rows, old_ids):
+            try:
+                with transaction.atomic():
+                    cursor.execute(sql, values)
+                    result = cursor.fetchone()
+            except Exception as e:
+                error_msg = f"Fehler bei Zeile in {pg_table}: {e}"
+                print(f"  ⚠ {error_msg}")
+                logging.error(f"{error_msg} | Values: {values}")
+                continue
+            if result is None:
+                # Konflikt: Zeile existiert bereits
+                continue
+            new_id = result[0]
+            if old_id:
+                self.id_mapping[pg_table][old_id] = new_id
+            inserted += 1
+        return inserted
+    
+    def _write_copy(self, cursor, pg_table, cols_str, pg_col_types, rows):
+        """COPY BINARY wenn alle Spaltentypen packbar sind, sonst COPY Text"""
+        if all(col_type in BINARY_PACKERS for col_type in pg_col_types):
+            return self._copy_rows_binary(cursor, pg_table, cols_str, pg_col_types, rows)
+        return self._copy_rows(cursor, pg_table, cols_str, rows)
+    
+    def _log_copy_error(self, pg_table, rows, e):
+        error_msg = f"Fehler bei COPY von {len(rows)} Zeilen in {pg_table}: {e}"
+        print(f"  ⚠ {error_msg}")
+        logging.error(error_msg)
+    
+    def _copy_chunk(self, cursor, pg_table, cols_str, pg_col_types, rows):
+        """COPY eines Blocks über die Django-Verbindung, gibt Anzahl Zeilen zurück"""
+        try:
+            # Savepoint, damit ein Fehler die Migrations-Transaktion nicht abbricht
+            with transaction.atomic():
+                return self._write_copy(cursor, pg_table, cols_str, pg_col_types, rows)
+        except Exception as e:
+            self._log_copy_error(pg_table, rows, e)
+            return self._copy_fallback(cursor, pg_table, cols_str, rows)
+    
+    def _copy_fallback(self, cursor, pg_table, cols_str, rows):
+        """COPY-Block fehlgeschlagen: per INSERT nachladen, damit nur fehlerhafte Zeilen fehlen"""
+        print(f"  ⚠ Lade {len(rows)} Zeilen in {pg_table} per INSERT nach")
+        return self._insert_rows_paged(cursor, pg_table, cols_str, rows, [None] * len(rows))
+    
+    def _get_copy_connection(self):
+        """Eigene psycopg2-Verbindung für den aktuellen COPY-Thread"""
+        conn = getattr(self._copy_local, 'conn', None)
+        if conn is None:
+            conn = django_connection.get_new_connection(django_connection.get_connection_params())
+            with conn.cursor() as cursor:
+                # Naive Zeitstempel im COPY Text wie in Django als UTC
+                cursor.execute("SET TIME ZONE 'UTC'")
+                cursor.execute("SET synchronous_commit = OFF")
+            conn.commit()
+            self._copy_local.conn = conn
+            with self._copy_connections_lock:
+                self._copy_connections.append(conn)
+        return conn
+    
+    def _copy_chunk_worker(self, pg_table, cols_str, pg_col_types, rows):
+        """Läuft im ThreadPool: COPY eines Blocks über die Thread-Verbindung
+        
+        Gibt (Anzahl, fehlgeschlagene Zeilen oder None) zurück; den INSERT-Fallback
+        macht der Haupt-Thread über die Django-Verbindung.
+        """
+        conn = self._get_copy_connection()
+        try:
+            with conn.cursor() as cursor:
+                count = self._write_copy(cursor, pg_table, cols_str, pg_col_types, rows)
+            conn.commit()
+            return count, None
+        except Exception as e:
+            conn.rollback()
+            self._log_copy_error(pg_table, rows, e)
+            return 0, rows
+    
+    def _close_copy_connections(self):
+        """Schließt alle COPY-Verbindungen der Threads"""
+        with self._copy_connections_lock:
+            for conn in self._copy_connections:
+                conn.close()
+            self._copy_connections = []
+        self._copy_local = threading.local()
+    
+    def _copy_rows_binary(self, cursor, pg_table, cols_str, pg_col_types, rows):
+        """Schreibt Zeilen per COPY BINARY, gibt Anzahl gepackter Zeilen zurück"""
+        buf = io.BytesIO()
+        buf.write(BINARY_COPY_HEADER)
+        packed_count = 0
+        for values in rows:
+            try:
+                buf.write(_pack_row(pg_col_types, values))
+                packed_count += 1
+            except (ValueError, TypeError, AttributeError, OverflowError, struct.error) as e:
+                error_msg = f"Fehler beim Packen einer Zeile für {pg_table}: {e}"
+                print(f"  ⚠ {error_msg}")
+                logging.error(f"{error_msg} | Values: {values}")
+        buf.write(BINARY_COPY_TRAILER)
+        buf.seek(0)
+        
+        cursor.copy_expert(f"COPY {pg_table} ({cols_str}) FROM STDIN WITH (FORMAT binary)", buf)
+        return packed_count
+    
+    def _copy_rows(self, cursor, pg_table, cols_str, rows):
+        """Schreibt Zeilen per COPY FROM STDIN, gibt Anzahl geschriebener Zeilen zurück"""
+        buf = io.StringIO()
+        for values in rows:
+            buf.write('\t'.join(_copy_text_value(v) for v in values))
+            buf.write('\n')
+        buf.seek(0)
+        
+        cursor.copy_expert(f"COPY {pg_table} ({cols_str}) FROM STDIN WITH (FORMAT text)", buf)
+        return len(rows)
+    
+    def _debug_first_row(self, plan, col_mapping, row, values):
+        """Gibt aus, woher die ersten Werte der ersten Zeile kommen"""
+        for spec, value in zip(plan[:5], values):
+            if spec.static is not NO_STATIC or spec.dynamic is not None:
+                print(f"    DEBUG: Spalte '{spec.pg_col}' -> Wert '{value}' (speziell)")
+            elif spec.src_idx is not None:
+                print(f"    DEBUG: Spalte '{spec.pg_col}' <- '{col_mapping.get(spec.pg_col)}' = '{str(row[spec.src_idx])[:20]}...' (aus SQLite)")
     
     def _migrate_table(self, pg_table, sqlite_table):
         """Migriert eine einzelne Tabelle"""
         print(f"\nMigriere {sqlite_table} -> {pg_table}...")
         
-        # Daten aus SQLite holen
-        columns, rows = self.sqlite_analyzer.get_data(sqlite_table)
-        if not rows:
+        # Daten aus SQLite blockweise holen (nicht die ganze Tabelle im Speicher)
+        chunks = self.sqlite_analyzer.iter_data(sqlite_table)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
             print(f"  Keine Daten in {sqlite_table}")
             return
+        columns, first_rows = first_chunk
+        rows = chain(first_rows, (row for _, rows_chunk in chunks for row in rows_chunk))
         
         # Spalten-Mapping
         col_mapping = self.mapper.column_mapping[pg_table]
         
         # Tatsächliche PostgreSQL-Spalten ermitteln (mit exakter Schreibweise)
-        with django_connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = %s
-                ORDER BY ordinal_position
-            """, [pg_table])
-            actual_pg_columns = {row[0]: row[0] for row in cursor.fetchall()}  # Dict: lowercased -> actual name
+        actual_pg_columns = self._get_actual_columns(pg_table)  # Dict: lowercased -> actual name
         
         # Pflichtfelder ermitteln
         required_columns = self._get_required_columns(pg_table)
         
         # Korrigiere Mapping-Schlüssel auf tatsächliche Spaltennamen
-        corrected_col_mapping = {}
-        for col_key, sqlite_col in col_mapping.items():
-            # Finde die exakte Schreibweise der PostgreSQL-Spalte
-            actual_col = actual_pg_columns.get(col_key)
-            if actual_col:
-                corrected_col_mapping[actual_col] = sqlite_col
-            else:
-                # Case-insensitive Match
-                found = False
-                for actual_name in actual_pg_columns.values():
-                    if actual_name.lower() == col_key.lower():
-                        corrected_col_mapping[actual_name] = sqlite_col
-                        found = True
-                        break
-                # Wenn nicht gefunden, behalte Original (kann None sein)
-                if not found:
-                    corrected_col_mapping[col_key] = sqlite_col
+        # (exakte Schreibweise zuerst, sonst case-insensitive, sonst Original)
+        lower_to_actual = {name.lower(): name for name in actual_pg_columns}
+        corrected_col_mapping = {
+            actual_pg_columns.get(col_key) or lower_to_actual.get(col_key.lower(), col_key): sqlite_col
+            for col_key, sqlite_col in col_mapping.items()
+        }
         
         col_mapping = corrected_col_mapping
         
@@ -605,311 +1330,289 @@ class DataMigrator:
         
         # Für Pflichtfelder ohne Mapping: Mapping auf None setzen (wird später behandelt)
         for col in required_columns:
-            if col not in col_mapping and col in actual_pg_columns.values():
+            if col not in col_mapping and col in actual_pg_columns:
                 col_mapping[col] = None
                 if col not in pg_columns:
                     pg_columns.append(col)
         
-        # Datumsspalten ermitteln
-        date_columns = self._get_date_columns(pg_table)
-        
-        # Foreign Key Spalten identifizieren
-        fk_columns = [col for col in pg_columns if col.endswith('_id')]
-        
         # ID-Spalte finden
         id_col_sqlite = 'id' if 'id' in columns else None
         
-        with django_connection.cursor() as cursor:
-            migrated_count = 0
-            skipped_count = 0
-            for row in rows:
-                # Daten mappen
-                row_dict = dict(zip(columns, row))
-                values = []
-                pg_cols_clean = []
-                skip_row = False
-                
-                # SPEZIELLE LOGIK FÜR CellLibrary Migration
-                if sqlite_table == 'CellLibrary' and pg_table == 'megacellcnc_cells':
-                    # 1. Project ermitteln/erstellen via ProjectName
-                    project_name = row_dict.get('ProjectName', '')
-                    project_id = self._ensure_project(project_name)
-                    # In row_dict speichern für spätere Verwendung
-                    row_dict['_project_id'] = project_id
-                    
-                    # 2. UUID generieren
-                    uuid = self._generate_uuid(row_dict, pg_table)
-                    row_dict['_uuid'] = uuid
-                    
-                    # 3. Available konvertieren
-                    available_val = row_dict.get('Available')
-                    row_dict['_available'] = self._convert_available(available_val)
+        # Positionszugriff auf die SQLite-Tupel statt dict pro Zeile
+        col_idx = {name: i for i, name in enumerate(columns)}
+        id_idx = col_idx.get('id')
+        
+        # CellLibrary -> megacellcnc_cells braucht Sonderbehandlung
+        is_celllib = sqlite_table == 'CellLibrary' and pg_table == 'megacellcnc_cells'
+        
+        # Projects für CellLibrary vorab anlegen (statt get_or_create pro Zeile)
+        if is_celllib and 'ProjectName' in columns:
+            self._preload_projects(sqlite_table)
+        if is_celllib:
+            # Pre-Processing-Werte werden hinten an das Tupel angehängt
+            col_idx['_project_id'] = len(columns)
+            col_idx['_uuid'] = len(columns) + 1
+            col_idx['_available'] = len(columns) + 2
+        
+        # COPY wenn keine ID-Zuordnung gebraucht wird (kein RETURNING möglich),
+        # sonst execute_values mit RETURNING id
+        use_copy = not (id_col_sqlite and self._needs_id_mapping(pg_table))
+        if not use_copy:
+            self.id_mapping[pg_table] = self._new_id_mapping(sqlite_table)
+        
+        # Was pro Spalte zu tun ist (statt der Verzweigungen pro Zeile und Spalte)
+        plan = self._build_column_plan(pg_table, sqlite_table, pg_columns, col_mapping, col_idx, is_celllib)
+        
+        # Ohne TRUNCATE: bereits migrierte Zellen (gleiche UUID) überspringen
+        existing_uuids = None
+        if not self._truncated and 'UUID' in pg_columns:
+            existing_uuids = self._load_existing_uuids(pg_table)
+            uuid_pos = pg_columns.index('UUID')
+        existing_count = 0
+        copy_rows = []
+        insert_rows = []
+        insert_old_ids = []
+        # Spalten in Anführungszeichen setzen für case-sensitive Namen
+        cols_str = ','.join([f'"{col}"' for col in pg_columns])
+        # Wird der Primary Key mitgeschrieben: Duplikate pro Block vorher entfernen,
+        # sonst scheitert der ganze Block (COPY / mehrzeiliges INSERT)
+        pk_cols = self._get_pk_columns(pg_table)
+        pk_pos = [pg_columns.index(col) for col in pk_cols] if pk_cols and all(col in pg_columns for col in pk_cols) else None
+        # COPY BINARY nur wenn für alle Spaltentypen ein Packer existiert, sonst Text
+        table_types = self.mapper.pg_tables.get(pg_table, {})
+        pg_col_types = [table_types.get(col, {}).get('type') for col in pg_columns]
+        
+        # COPY-Blöcke parallel über eigene Verbindungen schreiben, während
+        # der Haupt-Thread die nächsten Zeilen aufbereitet
+        copy_executor = ThreadPoolExecutor(max_workers=COPY_WORKERS) if use_copy and COPY_WORKERS > 1 else None
+        pending_copies = deque()
+        
+        # Bulk-Load per COPY: Indizes erst danach aufbauen
+        index_defs = []
+        if use_copy:
+            index_defs = self._drop_indexes(pg_table)
+        
+        def finish_copy(future):
+            count, failed_rows = future.result()
+            if failed_rows:
+                count += self._copy_fallback(cursor, pg_table, cols_str, failed_rows)
+            return count
+        
+        duplicate_count = 0
+        
+        def flush_copy(rows_chunk):
+            nonlocal duplicate_count
+            if pk_pos:
+                rows_chunk, _, dropped = self._dedupe_rows(rows_chunk, pk_pos)
+                duplicate_count += dropped
+            if copy_executor is None:
+                return self._copy_chunk(cursor, pg_table, cols_str, pg_col_types, rows_chunk)
+            pending_copies.append(copy_executor.submit(
+                self._copy_chunk_worker, pg_table, cols_str, pg_col_types, rows_chunk
+            ))
+            # Höchstens 2 Blöcke pro Thread im Speicher halten
+            done = 0
+            while len(pending_copies) > COPY_WORKERS * 2:
+                done += finish_copy(pending_copies.popleft())
+            return done
+        
+        failed = True
+        try:
+            with django_connection.cursor() as cursor:
+                migrated_count = 0
+                skipped_count = 0
+                total_count = 0
+                # Attribute einmal in Locals binden (LOAD_FAST statt LOAD_ATTR pro Zelle)
+                convert_dt = self._convert_datetime
+                gen_uuid = self._generate_uuid
+                ensure_project = self._ensure_project
+                convert_available = self._convert_available
+                for row in rows:
+                    total_count += 1
+                    if total_count % PROGRESS_EVERY == 0:
+                        sys.stdout.write(f"\r  ... {total_count} Zeilen verarbeitet")
+                        sys.stdout.flush()
+                    values = []
+                    skip_row = False
+                    first_row = MIGRATE_DEBUG and total_count == 1
                     
-                    # DEBUG für erste Zeile
-                    if migrated_count == 0 and skipped_count == 0:
-                        print(f"\n  DEBUG: Erste Zeile CellSerialNumber={row_dict.get('CellSerialNumber')}")
-                        print(f"  DEBUG: project_id={project_id}, uuid={uuid}, available={row_dict['_available']}")
-                        print(f"  DEBUG: pg_columns hat {len(pg_columns)} Spalten")
-                        print(f"  DEBUG: Erste 5 pg_columns: {pg_columns[:5]}")
-                        print(f"  DEBUG: 'UUID' in pg_columns: {'UUID' in pg_columns}")
-                        print(f"  DEBUG: 'project_id' in pg_columns: {'project_id' in pg_columns}")
-                
-                for pg_col in pg_columns:
-                    sqlite_col = col_mapping.get(pg_col) if pg_col in col_mapping else None
-                    # Leere Strings als "kein Mapping" behandeln
-                    if sqlite_col == '':
-                        sqlite_col = None
-                    value = None
+                    # SPEZIELLE LOGIK FÜR CellLibrary Migration
+                    if is_celllib:
+                        # 1. Project ermitteln/erstellen via ProjectName
+                        project_name = _row_value(row, col_idx, 'ProjectName', '')
+                        project_id = ensure_project(project_name)
+                        
+                        # 2. UUID generieren
+                        cell_serial = _row_value(row, col_idx, 'CellSerialNumber')
+                        uuid = gen_uuid(cell_serial, _row_value(row, col_idx, 'LogDate'), pg_table)
+                        
+                        # 3. Available konvertieren
+                        available = convert_available(_row_value(row, col_idx, 'Available'))
+                        
+                        # Für spätere Verwendung an das Tupel anhängen
+                        row = row + (project_id, uuid, available)
+                        
+                        # DEBUG für erste Zeile
+                        if first_row:
+                            print(f"\n  DEBUG: Erste Zeile CellSerialNumber={cell_serial}")
+                            print(f"  DEBUG: project_id={project_id}, uuid={uuid}, available={available}")
+                            print(f"  DEBUG: pg_columns hat {len(pg_columns)} Spalten")
+                            print(f"  DEBUG: Erste 5 pg_columns: {pg_columns[:5]}")
+                            print(f"  DEBUG: 'UUID' in pg_columns: {'UUID' in pg_columns}")
+                            print(f"  DEBUG: 'project_id' in pg_columns: {'project_id' in pg_columns}")
                     
-                    # Spezielle Werte aus CellLibrary Pre-Processing
-                    if sqlite_table == 'CellLibrary' and pg_table == 'megacellcnc_cells':
-                        if pg_col == 'project_id':
-                            value = row_dict.get('_project_id')
-                        elif pg_col == 'UUID':
-                            value = row_dict.get('_uuid')
-                        elif pg_col == 'available':
-                            value = row_dict.get('_available')
-                        elif pg_col == 'cell_type':
-                            # Immer auf 18650 setzen (aktuell nur dieser Type verwendet)
-                            value = '18650'
-                        elif pg_col == 'device_ip':
-                            # Versuche aus charger_icc zu holen, sonst Default
-                            value = row_dict.get('charger_icc', '192.168.1.33')
-                        elif pg_col == 'device_slot':
-                            # Aus CCiD holen
-                            value = row_dict.get('CCiD', 0)
-                        elif pg_col == 'device_mac':
-                            value = '00:00:00:00:00:00'
-                        elif pg_col == 'device_type':
-                            value = row_dict.get('charger_type', 'Unknown')
-                        elif pg_col == 'charge_duration':
-                            value = 0.0
-                        elif pg_col == 'discharge_duration':
-                            value = 0.0
-                        elif pg_col == 'avg_temp_charging':
-                            value = 0
-                        elif pg_col == 'avg_temp_discharging':
-                            value = 0
-                        elif pg_col == 'max_temp_charging':
-                            value = 0
-                        elif pg_col == 'max_temp_discharging':
-                            value = 0
-                        elif pg_col == 'testing_current':
-                            value = 0
-                        elif pg_col == 'discharge_mode':
-                            value = 'CC'
-                        elif pg_col == 'status':
-                            value = 'Completed'
-                        elif pg_col == 'bat_position':
-                            value = ''
-                        elif pg_col == 'battery_id':
-                            value = None
-                        elif pg_col == 'removal_date':
-                            value = None
+                    for spec in plan:
+                        # Häufigster Fall zuerst: Wert direkt aus dem SQLite-Tupel
+                        if spec.direct:
+                            value = row[spec.src_idx]
+                            values.append(None if value == '' else value)
+                            continue
                         
-                        # Prüfen ob diese Spalte speziell behandelt wurde
-                        # NUR die Spalten, die tatsächlich oben behandelt werden!
-                        was_handled = pg_col in ['UUID', 'project_id', 'available', 'cell_type', 'device_ip', 
-                                                  'device_slot', 'device_mac', 'device_type', 
-                                                  'charge_duration', 'discharge_duration', 'avg_temp_charging', 
-                                                  'avg_temp_discharging', 'max_temp_charging', 'max_temp_discharging', 
-                                                  'testing_current', 'discharge_mode', 'status', 'bat_position', 
-                                                  'battery_id', 'removal_date']
+                        pg_col = spec.pg_col
                         
-                        # WICHTIG: Wenn Spalte speziell behandelt wurde, zu values hinzufügen und continue
-                        if was_handled:
-                            # Direkt zu values hinzufügen und zur nächsten Spalte
-                            if migrated_count == 0 and skipped_count == 0 and len(values) < 3:
-                                print(f"    DEBUG: Spalte '{pg_col}' -> Wert '{value}' (speziell)")
+                        # Spezielle Werte aus CellLibrary Pre-Processing
+                        # WICHTIG: Wenn Spalte speziell behandelt wird, zu values hinzufügen und continue
+                        if spec.static is not NO_STATIC or spec.dynamic is not None:
+                            if spec.static is not NO_STATIC:
+                                value = spec.static
+                            else:
+                                value = spec.dynamic(row, col_idx)
                             values.append(value)
-                            pg_cols_clean.append(pg_col)
                             continue
+                        
+                        # Wert aus SQLite holen
+                        value = None
+                        if spec.src_idx is not None:
+                            value = row[spec.src_idx]
+                        
+                        # slot_number speziell behandeln (vor anderen Checks)
+                        if spec.is_slot:
+                            # Immer versuchen, slot_number zu setzen, auch wenn kein Mapping existiert
+                            if value is None or value == '':
+                                # Versuche verschiedene Quellen
+                                cell_id = _row_value(row, col_idx, 'cell_id')
+                                charger_cell_id = _row_value(row, col_idx, 'ChargerCell_id') or _row_value(row, col_idx, 'CCiD')
+                                
+                                # Bevorzuge cell_id (scheint die Slot-Nummer zu sein)
+                                if cell_id:
+                                    try:
+                                        value = int(cell_id)
+                                    except (ValueError, TypeError):
+                                        pass
+                                
+                                # Fallback: ChargerCell_id
+                                if value is None and charger_cell_id:
+                                    try:
+                                        # ChargerCell_id könnte die Slot-Nummer sein (z.B. 116 -> 16)
+                                        charger_val = int(charger_cell_id)
+                                        # Letzte 2 Ziffern, sonst letzte Ziffer, sonst direkt
+                                        value = charger_val % 100 or charger_val % 10 or charger_val
+                                    except (ValueError, TypeError):
+                                        pass
+                                
+                                # Fallback: Default
+                                if value is None:
+                                    value = 1
+                        
+                        # UUID generieren wenn fehlend und Pflichtfeld
+                        if spec.gen_uuid and (value is None or value == ''):
+                            value = gen_uuid(_row_value(row, col_idx, 'CellSerialNumber'), _row_value(row, col_idx, 'LogDate'), pg_table)
+                        
+                        # Datumswert konvertieren
+                        if spec.is_date and value is not None:
+                            value = convert_dt(value, pg_col)
+                        
+                        # Foreign Key Mapping (nur wenn noch nicht durch spezielle Logik gesetzt)
+                        if spec.is_fk and value is not None:
+                            if value:
+                                # ID mappen (wenn bereits migriert), sonst NULL
+                                fk_ids = spec.fk_ids
+                                value = fk_ids.get(value) if fk_ids is not None else None
+                        
+                        # NULL-Werte korrekt behandeln
+                        if value == '':
+                            value = None
+                        
+                        # Pflichtfeld prüfen (Default aus dem Spaltenplan)
+                        if value is None and spec.required:
+                            if spec.default is REQUIRED_UUID:
+                                value = gen_uuid(_row_value(row, col_idx, 'CellSerialNumber'), _row_value(row, col_idx, 'LogDate'), pg_table) or f"MIGRATED-{uuid_lib.uuid4().hex[:12].upper()}"
+                            elif spec.default is REQUIRED_SKIP:
+                                logging.warning(f"Pflichtfeld {pg_col} ist NULL in {pg_table}, überspringe Zeile")
+                                skip_row = True
+                                break
+                            else:
+                                value = spec.default
+                        
+                        # Immer hinzufügen (auch NULL-Werte), values ist positionsgleich zu pg_columns
+                        values.append(value)
                     
-                    # Wert aus SQLite holen (nur wenn noch nicht durch spezielle Logik gesetzt)
-                    if sqlite_col and sqlite_col in row_dict:
-                        value = row_dict[sqlite_col]
-                        if migrated_count == 0 and skipped_count == 0 and len(values) < 5:
-                            print(f"    DEBUG: Spalte '{pg_col}' <- '{sqlite_col}' = '{str(value)[:20]}...' (aus SQLite)")
-                    
-                    # slot_number speziell behandeln (vor anderen Checks)
-                    if pg_col == 'slot_number':
-                        # Immer versuchen, slot_number zu setzen, auch wenn kein Mapping existiert
-                        if value is None or value == '':
-                            # Versuche verschiedene Quellen
-                            cell_id = row_dict.get('cell_id')
-                            charger_cell_id = row_dict.get('ChargerCell_id') or row_dict.get('CCiD')
-                            
-                            # Bevorzuge cell_id (scheint die Slot-Nummer zu sein)
-                            if cell_id:
-                                try:
-                                    value = int(cell_id)
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            # Fallback: ChargerCell_id
-                            if value is None and charger_cell_id:
-                                try:
-                                    # ChargerCell_id könnte die Slot-Nummer sein (z.B. 116 -> 16)
-                                    charger_val = int(charger_cell_id)
-                                    # Versuche letzte 2 Ziffern
-                                    value = charger_val % 100
-                                    if value == 0:
-                                        # Oder letzte Ziffer
-                                        value = charger_val % 10
-                                    if value == 0:
-                                        # Oder verwende direkt
-                                        value = charger_val
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            # Fallback: Default
-                            if value is None:
-                                value = 1
-                    
-                    # UUID generieren wenn fehlend und Pflichtfeld
-                    if pg_col == 'UUID' and (value is None or value == '') and pg_col in required_columns:
-                        value = self._generate_uuid(row_dict, pg_table)
-                    
-                    # Datumswert konvertieren
-                    if pg_col in date_columns and value is not None:
-                        value = self._convert_datetime(value, pg_col)
+                    # DEBUG für erste Zeile: Auflösung der ersten Spalten (einmal, nicht pro Spalte)
+                    if first_row:
+                        self._debug_first_row(plan, col_mapping, row, values)
                     
-                    # Foreign Key Mapping (nur wenn noch nicht durch spezielle Logik gesetzt)
-                    if pg_col in fk_columns and value is not None:
-                        # Für CellLibrary: project_id wurde bereits gesetzt, nicht überschreiben
-                        if sqlite_table == 'CellLibrary' and pg_col == 'project_id':
-                            pass  # Wert behalten
-                        else:
-                            old_id = value
-                            if old_id:
-                                # ID mappen (wenn bereits migriert)
-                                fk_table = pg_col.replace('_id', '')
-                                # Tabelle finden (z.B. project_id -> megacellcnc_projects)
-                                for table in self.MIGRATION_ORDER:
-                                    if fk_table in table or table.endswith(f'_{fk_table}'):
-                                        if table in self.id_mapping and old_id in self.id_mapping[table]:
-                                            value = self.id_mapping[table][old_id]
-                                            break
-                                else:
-                                    value = None  # Foreign Key noch nicht migriert
+                    # Zeile überspringen wenn nötig
+                    if skip_row:
+                        skipped_count += 1
+                        # DEBUG für erste übersprungene Zeile
+                        if MIGRATE_DEBUG and skipped_count == 1:
+                            print(f"\n  DEBUG: Erste Zeile übersprungen!")
+                            print(f"  DEBUG: pg_columns={len(pg_columns)}, values={len(values)}")
+                            print(f"  DEBUG: Letzte 5 pg_cols: {pg_columns[max(0, len(values) - 5):len(values)]}")
+                            print(f"  DEBUG: Letzte 5 values: {values[-5:] if len(values) > 5 else values}")
+                        continue
                     
-                    # NULL-Werte korrekt behandeln
-                    if value == '':
-                        value = None
+                    if existing_uuids is not None and values[uuid_pos] in existing_uuids:
+                        existing_count += 1
+                        continue
                     
-                    # Pflichtfeld prüfen
-                    if value is None and pg_col in required_columns:
-                        # Default-Werte für Pflichtfelder
-                        if pg_col == 'UUID':
-                            value = self._generate_uuid(row_dict, pg_table) or f"MIGRATED-{uuid_lib.uuid4().hex[:12].upper()}"
-                        elif pg_col in ['voltage', 'capacity', 'esr', 'esr_ac', 'min_voltage', 'max_voltage', 'store_voltage', 'store_Voltage']:
-                            value = 0.0
-                        elif pg_col in ['test_duration', 'charge_duration', 'discharge_duration', 'action_running_time']:
-                            value = 0.0
-                        elif pg_col in ['device_slot', 'cycles_count', 'testing_current', 'discharge_cycles_set', 'completed_cycles']:
-                            value = 0
-                        elif pg_col in ['temp_before_test', 'avg_temp_charging', 'avg_temp_discharging', 'max_temp_charging', 'max_temp_discharging']:
-                            value = 0
-                        elif pg_col in ['max_capacity', 'chg_current', 'pre_chg_current', 'ter_chg_current', 'discharge_current', 'discharge_resistance', 'discharge_mod', 'max_temp', 'low_volt_max_time', 'max_charge_duration', 'discharge_cycles']:
-                            value = 0
-                        elif pg_col in ['status', 'available', 'cell_type', 'device_type', 'discharge_mode', 'name']:
-                            value = 'Unknown'
-                        elif pg_col == 'device_ip' or pg_col == 'ip':
-                            value = '0.0.0.0'
-                        elif pg_col == 'device_mac' or pg_col == 'mac':
-                            value = '00:00:00:00:00:00'
-                        elif pg_col == 'type':
-                            value = 'Unknown'
-                        elif pg_col == 'bat_position':
-                            value = ''
-                        elif pg_col == 'runtime':
-                            # DurationField braucht ein timedelta
-                            from datetime import timedelta
-                            value = timedelta(0)
-                        elif pg_col == 'project_id':
-                            # Foreign Key - überspringe Zeile wenn nicht vorhanden
-                            logging.warning(f"Pflichtfeld project_id ist NULL in {pg_table}, überspringe Zeile")
-                            skip_row = True
-                            break
-                        elif pg_col == 'device_id':
-                            # Foreign Key - überspringe Zeile wenn nicht vorhanden
-                            logging.warning(f"Pflichtfeld device_id ist NULL in {pg_table}, überspringe Zeile")
-                            skip_row = True
-                            break
-                        else:
-                            # Versuche generische Defaults basierend auf Typ
-                            with django_connection.cursor() as type_cursor:
-                                type_cursor.execute("""
-                                    SELECT data_type
-                                    FROM information_schema.columns
-                                    WHERE table_name = %s AND column_name = %s
-                                """, [pg_table, pg_col])
-                                col_type_result = type_cursor.fetchone()
-                                if col_type_result:
-                                    col_type = col_type_result[0]
-                                    if 'int' in col_type.lower():
-                                        value = 0
-                                    elif 'float' in col_type.lower() or 'double' in col_type.lower() or 'numeric' in col_type.lower():
-                                        value = 0.0
-                                    elif 'char' in col_type.lower() or 'text' in col_type.lower():
-                                        value = ''
-                                    elif 'bool' in col_type.lower():
-                                        value = False
-                                    else:
-                                        logging.warning(f"Pflichtfeld {pg_col} ({col_type}) ist NULL in {pg_table}, überspringe Zeile")
-                                        skip_row = True
-                                        break
-                                else:
-                                    logging.warning(f"Pflichtfeld {pg_col} ist NULL in {pg_table}, überspringe Zeile")
-                                    skip_row = True
-                                    break
+                    # COPY-Puffer
+                    if use_copy:
+                        copy_rows.append(values)
+                        if len(copy_rows) >= COPY_CHUNK_SIZE:
+                            migrated_count += flush_copy(copy_rows)
+                            copy_rows = []
+                        continue
                     
-                    # Immer hinzufügen (auch NULL-Werte können wichtig sein)
-                    values.append(value)
-                    pg_cols_clean.append(pg_col)
+                    # INSERT-Puffer (execute_values mit RETURNING id)
+                    if values:
+                        insert_rows.append(values)
+                        insert_old_ids.append(row[id_idx] if id_col_sqlite else None)
+                        if len(insert_rows) >= INSERT_PAGE_SIZE:
+                            if pk_pos:
+                                insert_rows, insert_old_ids, dropped = self._dedupe_rows(insert_rows, pk_pos, insert_old_ids)
+                                duplicate_count += dropped
+                            migrated_count += self._insert_rows(cursor, pg_table, cols_str, insert_rows, insert_old_ids)
+                            insert_rows = []
+                            insert_old_ids = []
                 
-                # Zeile überspringen wenn nötig
-                if skip_row:
-                    skipped_count += 1
-                    # DEBUG für erste übersprungene Zeile
-                    if skipped_count == 1:
-                        print(f"\n  DEBUG: Erste Zeile übersprungen!")
-                        print(f"  DEBUG: pg_columns={len(pg_columns)}, values={len(values)}")
-                        print(f"  DEBUG: Letzte 5 pg_cols: {pg_cols_clean[-5:] if len(pg_cols_clean) > 5 else pg_cols_clean}")
-                        print(f"  DEBUG: Letzte 5 values: {values[-5:] if len(values) > 5 else values}")
-                    continue
+                if insert_rows:
+                    if pk_pos:
+                        insert_rows, insert_old_ids, dropped = self._dedupe_rows(insert_rows, pk_pos, insert_old_ids)
+                        duplicate_count += dropped
+                    migrated_count += self._insert_rows(cursor, pg_table, cols_str, insert_rows, insert_old_ids)
+                if copy_rows:
+                    migrated_count += flush_copy(copy_rows)
+                while pending_copies:
+                    migrated_count += finish_copy(pending_copies.popleft())
                 
-                # INSERT
-                if values:
-                    placeholders = ','.join(['%s'] * len(values))
-                    # Spalten in Anführungszeichen setzen für case-sensitive Namen
-                    cols_str = ','.join([f'"{col}"' for col in pg_cols_clean])
-                    
-                    try:
-                        sql = f"""
-                            INSERT INTO {pg_table} ({cols_str}) 
-                            VALUES ({placeholders})
-                            ON CONFLICT DO NOTHING
-                            RETURNING id
-                        """
-                        cursor.execute(sql, values)
-                        result = cursor.fetchone()
-                        if result:
-                            # ID Mapping speichern
-                            old_id = row_dict.get('id') if id_col_sqlite else None
-                            if old_id:
-                                self.id_mapping[pg_table][old_id] = result[0]
-                            migrated_count += 1
-                    except Exception as e:
-                        error_msg = f"Fehler bei Zeile in {pg_table}: {e}"
-                        print(f"  ⚠ {error_msg}")
-                        logging.error(f"{error_msg} | Row data: {row_dict}")
-                        continue
-            
-            django_connection.commit()
-            print(f"  ✓ {migrated_count} von {len(rows)} Zeilen migriert")
-            if skipped_count > 0:
-                print(f"  ⚠ {skipped_count} Zeilen übersprungen (fehlende Pflichtfelder)")
+                print(f"\n  ✓ {migrated_count} von {total_count} Zeilen migriert")
+                if skipped_count > 0:
+                    print(f"  ⚠ {skipped_count} Zeilen übersprungen (fehlende Pflichtfelder)")
+                if existing_count > 0:
+                    print(f"  ⚠ {existing_count} Zeilen übersprungen (UUID bereits vorhanden)")
+                if duplicate_count > 0:
+                    print(f"  ⚠ {duplicate_count} Zeilen verworfen (doppelter Primary Key im Block)")
+            failed = False
+        finally:
+            if copy_executor is not None:
+                # Bei einem Fehler keine weiteren Blöcke mehr committen
+                copy_executor.shutdown(wait=True, cancel_futures=failed)
+                self._close_copy_connections()
+            # In der Einzel-Transaktion macht der Rollback auch DROP INDEX rückgängig;
+            # Befehle in der abgebrochenen Transaktion würden den Fehler nur verdecken
+            if not (failed and django_connection.in_atomic_block):
+                self._restore_indexes(pg_table, index_defs)
 
 
 def main():
@@ -12,6 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard.settings')
 django.setup()
 
+from django.db.models import Count
 from megacellcnc.models import Cells, Projects
 
 print('='*60)
@@ -24,22 +25,28 @@ print(f'Projects in DB: {Projects.objects.count()}')
 print()
 
 print('Projects mit Zellen-Anzahl:')
-for p in Projects.objects.all().order_by('id'):
-    cell_count = p.cells.count()
-    print(f'  [{p.id}] {p.Name}: {cell_count} Zellen')
+# Zellen-Anzahl per JOIN/GROUP BY statt einer COUNT-Abfrage pro Project
+for p in Projects.objects.annotate(cell_count=Count('cells')).order_by('id'):
+    print(f'  [{p.id}] {p.Name}: {p.cell_count} Zellen')
 
 print()
 
 # Beispiel-Zellen anzeigen
 print('Erste 5 Zellen:')
-for cell in Cells.objects.all().order_by('id')[:5]:
-    print(f'  [{cell.id}] {cell.UUID} - {cell.cell_type} - {cell.capacity}mAh - {cell.available}')
+# Nur die ausgegebenen Spalten laden, keine Model-Instanzen
+for cell in Cells.objects.order_by('id').values('id', 'UUID', 'cell_type', 'capacity', 'available')[:5]:
+    print(f"  [{cell['id']}] {cell['UUID']} - {cell['cell_type']} - {cell['capacity']}mAh - {cell['available']}")
 
 print()
 
 # Available-Status Statistik
-available_yes = Cells.objects.filter(available='Yes').count()
-available_no = Cells.objects.filter(available='No').count()
+# Beide Werte mit einer GROUP BY-Abfrage
+available_counts = {
+    row['available']: row['n']
+    for row in Cells.objects.filter(available__in=['Yes', 'No']).values('available').annotate(n=Count('id')).order_by()
+}
+available_yes = available_counts.get('Yes', 0)
+available_no = available_counts.get('No', 0)
 print(f'Available Status:')
 print(f'  Yes: {available_yes}')
 print(f'  No:  {available_no}')